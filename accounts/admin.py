@@ -8,6 +8,12 @@ class NotificationsInline(admin.TabularInline):
     extra = 0
 
 
+class NotificationRecipientsInline(admin.TabularInline):
+    model = Notification.target_users.through
+    extra = 0
+    autocomplete_fields = ['user', ]
+
+
 @admin.register(CustomUser)
 class CustomUserAdmin(BaseUserAdmin):
     list_display = ('id', 'mobile', 'username', 'is_active', 'is_staff', 'created_at')
@@ -58,4 +64,4 @@ class FollowAdmin(admin.ModelAdmin):
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ['id', 'created_at']
     list_filter = ['created_at']
-    autocomplete_fields = ['target_users', ]
+    inlines = [NotificationRecipientsInline]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
 from django.utils.timezone import now
@@ -76,6 +78,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
+        indexes = [
+            # Serves `icontains` and trigram similarity searches on usernames
+            GinIndex(OpClass(Upper('username'), name='gin_trgm_ops'), name='user_username_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -107,9 +113,35 @@ class Notification(models.Model):
     """
     Model to store notifications for users.
     """
-    target_users = models.ManyToManyField(CustomUser, related_name="notifications")
+    target_users = models.ManyToManyField(CustomUser, through='NotificationRecipient', related_name="notifications")
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Notification ID: {self.id}"
+
+
+class NotificationRecipient(models.Model):
+    """
+    A user targeted by a notification (the `Notification.target_users` through table).
+
+    The `(user, notification)` index lists the notifications of a user in ID order,
+    so their keyset pages are read straight from it, newest first, without sorting
+    all of the user's notifications.
+
+    The table already exists on databases created with the implicit through model,
+    so there the migration switching `target_users` to it must be state-only
+    (`SeparateDatabaseAndState`), keeping only the index changes as database operations.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column='customuser_id')
+
+    class Meta:
+        db_table = 'accounts_notification_target_users'  # The table of the former implicit through model
+        unique_together = ('notification', 'user')
+        indexes = [
+            models.Index(fields=['user', 'notification'], name='notification_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification {self.notification_id} for user {self.user_id}"
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.db import connection
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from unittest import skipUnless
+
+from .models import CustomUser, Notification
+
+
+class NotificationViewTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(mobile='09120000001', password='password')
+        self.other = CustomUser.objects.create_user(mobile='09120000002', password='password')
+        self.client.force_authenticate(self.user)
+
+    def notify(self, message, *users):
+        notification = Notification.objects.create(message=message)
+        notification.target_users.add(*users)
+        return notification
+
+    def test_pages_own_notifications_newest_first(self):
+        for number in range(5):
+            self.notify(f'Notification {number}', self.user)
+        self.notify('Someone else', self.other)
+
+        response = self.client.get('/api/auth/notifications/', {'page_size': 3})
+        self.assertEqual([n['message'] for n in response.data['results']], [
+            'Notification 4', 'Notification 3', 'Notification 2'
+        ])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([n['message'] for n in response.data['results']], ['Notification 1', 'Notification 0'])
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_follow_notifies_the_followed_user(self):
+        self.other.followings.create(following=self.user)
+
+        response = self.client.get('/api/auth/notifications/')
+        self.assertEqual(len(response.data['results']), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Trigram search requires PostgreSQL')
+class UserSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(mobile='09120000001', password='password', username='Mohammad')
+        CustomUser.objects.create_user(mobile='09120000002', password='password', username='Sara')
+        self.client.force_authenticate(self.user)
+
+    def search(self, term):
+        response = self.client.get('/api/auth/users/', {'search': term})
+        return [user['username'] for user in response.data['results']]
+
+    def test_matches_substrings_case_insensitively(self):
+        self.assertEqual(self.search('HAMM'), ['Mohammad'])
+
+    def test_matches_misspellings(self):
+        self.assertEqual(self.search('Mohamad'), ['Mohammad'])
@@ -1,10 +1,13 @@
-from rest_framework import generics, viewsets, status, permissions, filters
+from rest_framework import generics, viewsets, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from utils.filters import TrigramSearchFilter
+from utils.pagination import KeysetPagination
+
 from .permissions import IsOwnProfile
 from .models import CustomUser, Notification
 from .serializers import (
@@ -26,7 +29,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     queryset = CustomUser.objects.all().order_by('-created_at')
     permission_classes = [IsOwnProfile]  # Users only can edit their own profile
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [TrigramSearchFilter]  # Substring and fuzzy search, best match first
     search_fields = ['username', ]  # Fields available for searching
     pagination_class = PageNumberPagination
     lookup_field = 'username'
@@ -214,12 +217,24 @@ class FollowViewSet(viewsets.ViewSet):
         }, status=status.HTTP_204_NO_CONTENT)
 
 
+class NotificationPagination(KeysetPagination):
+    """
+    Keyset pagination for notifications, newest first.
+
+    IDs follow the creation order, and unlike `created_at` they are also stored in
+    the recipients table, whose `(user, notification)` index serves the pages.
+    """
+    ordering = '-id'
+
+
 class NotificationView(generics.ListAPIView):
     """
     API view to retrieve a list of notifications for the authenticated user.
+    Notifications are paginated with keyset cursors, newest first.
     """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
         """
@@ -12,6 +12,7 @@ class Chat(models.Model):
     is_group = models.BooleanField(default=False)  # Whether the chat is a group chat or private chat
     members = models.ManyToManyField(User, related_name='chats')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Bumped on every edit and message (see `chats.signals`)
 
     def __str__(self):
         return f'"{self.name[:10]}" - {self.id}' if self.name else f'"private" - {self.id}'
@@ -32,5 +33,11 @@ class Message(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs the `(created_at, id)` keyset pagination of chat messages
+            models.Index(fields=['chat', 'created_at', 'id'], name='message_chat_created_id_idx'),
+        ]
+
     def __str__(self):
         return str(self.id)
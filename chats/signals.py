@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+from .models import Chat, Message
+
+
+@receiver([post_save, post_delete], sender=Message)
+def touch_chat(sender, instance, **kwargs):
+    """
+    Signal to bump the `updated_at` of a chat when a message is sent or deleted,
+    so the chat list `ETag` only has to read the latest `updated_at` of the user's chats.
+    """
+    Chat.objects.filter(pk=instance.chat_id).update(updated_at=now())
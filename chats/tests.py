@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .models import Chat, Message
+
+User = get_user_model()
+
+
+class ChatListETagTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(mobile='09120000001', password='password')
+        self.chats = [Chat.objects.create(is_group=True, name=f'Chat {number}') for number in range(3)]
+        for chat in self.chats:
+            chat.members.add(self.user)
+        self.client.force_authenticate(self.user)
+
+    def send(self, chat):
+        return Message.objects.create(chat=chat, sender=self.user, content='Hello')
+
+    def get_etag(self):
+        response = self.client.get('/api/chats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['ETag']
+
+    def test_answers_not_modified(self):
+        etag = self.get_etag()
+
+        response = self.client.get('/api/chats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_messages_change_the_etag(self):
+        etag = self.get_etag()
+        self.send(self.chats[0])
+
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_different_last_messages_never_share_an_etag(self):
+        first, second = self.send(self.chats[0]), self.send(self.chats[1])
+        etag = self.get_etag()
+
+        # The last message IDs of the chats still add up to the same total
+        total = first.id + second.id
+        Message.objects.filter(id__in=[first.id, second.id]).delete()
+        Message.objects.create(id=total, chat=self.chats[2], sender=self.user, content='Hello')
+
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_deleted_messages_change_the_etag(self):
+        message = self.send(self.chats[0])
+        etag = self.get_etag()
+
+        message.delete()
+
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_leaving_a_chat_changes_the_etag(self):
+        etag = self.get_etag()
+
+        self.chats[0].members.remove(self.user)
+
+        self.assertNotEqual(self.get_etag(), etag)
@@ -2,10 +2,13 @@ from rest_framework import generics, permissions
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
+from utils.mixins import ConditionalGetMixin
 from utils.online_user_manager import OnlineUserManager
+from utils.pagination import KeysetPagination
 from accounts.serializers import UserListSerializer
 from .permissions import IsChatMemberPermission
 from .models import Chat, Message
@@ -88,11 +91,13 @@ class ChatCreateView(generics.CreateAPIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ChatListView(generics.ListAPIView):
+class ChatListView(ConditionalGetMixin, generics.ListAPIView):
     """
     View to list all chats of the authenticated user.
 
     Returns a list of chats where the user is a member.
+    The `ETag` is derived from the number of chats and their latest `updated_at`,
+    which every edit and message bumps, with a single aggregate query.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ChatSerializer
@@ -100,6 +105,10 @@ class ChatListView(generics.ListAPIView):
     def get_queryset(self):
         return Chat.objects.filter(members=self.request.user)
 
+    def get_etag(self):
+        state = self.get_queryset().aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        return f"{state['count']}:{state['updated_at']}"
+
 
 class ChatDetailView(generics.RetrieveAPIView):
     """
@@ -140,13 +149,22 @@ class ChatEditView(generics.UpdateAPIView):
         instance.delete()
 
 
+class MessagePagination(KeysetPagination):
+    """
+    Keyset pagination for chat messages, oldest first.
+    """
+    ordering = 'created_at'
+
+
 class ChatMessagesView(generics.ListAPIView):
     """
     View to list all messages for a specific chat.
 
     Returns a list of messages for the specified chat, where the user has permission to view.
+    Messages are paginated with `(created_at, id)` keyset cursors.
     """
     serializer_class = MessageSerializer
+    pagination_class = MessagePagination
     permission_classes = [permissions.IsAuthenticated,
                           IsChatMemberPermission
                           ]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment, Reaction, Tag
+from .models import Post, PostImageVariant, Comment, Reaction, Tag
 from django.utils.html import mark_safe
 
 
@@ -8,13 +8,27 @@ class TagInline(admin.TabularInline):
     autocomplete_fields = ['tag']
 
 
+class ImageVariantInline(admin.TabularInline):
+    model = PostImageVariant
+    fields = ('kind', 'image_format', 'image', 'width', 'height')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+class TaggedPostInline(admin.TabularInline):
+    model = Tag.posts.through
+    autocomplete_fields = ['post']
+    extra = 0
+
+
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('author', 'created_at', 'status', 'updated_at', 'image_thumbnail')
     list_filter = ('created_at', 'author')
     search_fields = ('id', 'title', 'content')
     autocomplete_fields = ('author', )
-    inlines = [TagInline]
+    inlines = [TagInline, ImageVariantInline]
 
     # show images in admin
     def image_thumbnail(self, obj):
@@ -36,8 +50,10 @@ class CommentAdmin(admin.ModelAdmin):
 class ReactionAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'reaction_type', 'created_at')
     list_filter = ('reaction_type', 'created_at')
+    list_select_related = ('user', )
     search_fields = ('id', 'user__username', 'post__id')
-    ordering = ('-created_at',)
+    ordering = ('-id',)  # Newest first, walking the primary key index instead of sorting the table
+    show_full_result_count = False  # Skip the extra `COUNT(*)` of the whole table when filtering
     autocomplete_fields = ('user', 'post', 'comment')
 
 
@@ -45,4 +61,4 @@ class ReactionAdmin(admin.ModelAdmin):
 class TagAdmin(admin.ModelAdmin):
     list_display = ('id', 'name')
     search_fields = ('name', )
-    autocomplete_fields = ('posts', )
+    inlines = [TaggedPostInline]  # `posts` has an explicit through model, so it's edited inline
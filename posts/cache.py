@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+import time
+import uuid
+
+
+class PostDetailCache:
+    """
+    Read-through cache of serialized post details, stored in the default (Redis) cache.
+
+    Every post has a version token; cached bodies are keyed by it, so invalidating a post
+    only replaces its token (see `posts.signals`) and stale bodies simply expire.
+    Bodies hold absolute URLs, so the key also includes the scheme and host of the request.
+
+    Fills are single-flight: when a body is missing, one request acquires a short lock and
+    builds it while concurrent requests wait for the result instead of all hitting the database.
+
+    The `ETag` of post lists is built from a list version token, replaced only when the listed
+    fields of a post change (the post itself, its tags, image variants or author name, see
+    `invalidate_lists`), plus a token per user replaced by their own post reactions (`my_reaction`).
+    Comments and reaction counters are not listed, so they leave the lists' `ETag` alone.
+    """
+    VERSION_TIMEOUT = 60 * 60 * 24  # Unused versions expire, a new one is created on the next read
+    LIST_VERSION_KEY = 'post:list:version'
+
+    @staticmethod
+    def user_list_version_key(user_id):
+        return f'post:list:user:{user_id}:version'
+
+    @staticmethod
+    def version_key(post_id):
+        return f'post:{post_id}:version'
+
+    @classmethod
+    def body_key(cls, post_id, version, request):
+        return f'post:{post_id}:detail:{version}:{request.build_absolute_uri("/")}'
+
+    @classmethod
+    def get_version(cls, post_id):
+        """
+        Returns the current version token of the post, creating it if missing.
+        """
+        return cls.get_or_create_version(cls.version_key(post_id))
+
+    @classmethod
+    def get_list_version(cls, user_id=None):
+        """
+        Returns the current version of the post lists as seen by the user (or anonymously),
+        creating the missing tokens.
+        """
+        version = cls.get_or_create_version(cls.LIST_VERSION_KEY)
+        if user_id is None:
+            return version
+        return f'{version}:{cls.get_or_create_version(cls.user_list_version_key(user_id))}'
+
+    @classmethod
+    def get_or_create_version(cls, key):
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, timeout=cls.VERSION_TIMEOUT)  # Another request may create it first
+            version = cache.get(key)
+
+        return version
+
+    @classmethod
+    def invalidate(cls, *post_ids, lists=False):
+        """
+        Replaces the version tokens of the posts (and of the lists, if `lists` is True) once the
+        current transaction commits, so readers never cache the data being written under the new version.
+        """
+        tokens = {cls.version_key(post_id): uuid.uuid4().hex for post_id in post_ids}
+        if lists:
+            tokens[cls.LIST_VERSION_KEY] = uuid.uuid4().hex
+        transaction.on_commit(lambda: cache.set_many(tokens, timeout=cls.VERSION_TIMEOUT))
+
+    @classmethod
+    def invalidate_user_lists(cls, user_id):
+        """
+        Replaces the list version token of the user once the current transaction commits,
+        when their `my_reaction` in the lists changes.
+        """
+        key = cls.user_list_version_key(user_id)
+        transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout=cls.VERSION_TIMEOUT))
+
+    @classmethod
+    def get_or_build(cls, post_id, request, build):
+        """
+        Returns the cached body of the post, calling `build()` to fill it if missing.
+        """
+        key = cls.body_key(post_id, cls.get_version(post_id), request)
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, timeout=settings.POST_CACHE_LOCK_TIMEOUT):
+            try:
+                data = build()
+                cache.set(key, data, timeout=settings.POST_CACHE_TIMEOUT)
+            finally:
+                cache.delete(lock_key)
+            return data
+
+        # Another request is filling the body, wait for it
+        deadline = time.monotonic() + settings.POST_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return data
+            if cache.get(lock_key) is None:
+                break  # The filling request failed (e.g. the post does not exist)
+
+        return build()  # The filling request failed or is too slow, build it here
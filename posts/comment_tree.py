@@ -0,0 +1,59 @@
+from django.conf import settings
+
+from .models import StatusChoices, Comment
+
+
+def build_comment_tree(post, max_depth=None, root=None):
+    """
+    Loads the published comments of a post in a single query and links them into a tree.
+
+    Every returned comment gets a `tree_replies` list holding its published replies,
+    which `CommentSerializer` reads instead of querying `obj.replies` per node.
+    Comments are read in materialized path order (a range scan of the `(post, path)` index),
+    so parents always come before their replies and siblings are already in display order;
+    replies whose parent is not published are dropped together with their parent.
+
+    Only `max_depth` levels (`COMMENT_TREE_MAX_DEPTH` by default) are loaded; deeper
+    replies are left for `/api/comments/{id}/replies/`, and their parents keep a `reply_count`.
+    If `root` is given, only its subtree is loaded and linked to it.
+
+    Returns the list of top-level comments (or `[root]`), oldest first.
+    """
+    if max_depth is None:
+        max_depth = settings.COMMENT_TREE_MAX_DEPTH
+
+    comments = Comment.objects.filter(
+        post=post,
+        status=StatusChoices.PUBLISHED
+    ).select_related('author').order_by('path')
+
+    nodes, roots = {}, []
+    if root is None:
+        comments = comments.filter(depth__lt=max_depth)
+    else:
+        if root.path:
+            comments = comments.filter(
+                path__startswith=root.path,
+                depth__gt=root.depth,
+                depth__lt=root.depth + max_depth
+            )
+        else:
+            comments = comments.filter(parent=root)  # Path not filled yet, only the direct replies are known
+
+        root.tree_replies = []
+        nodes[root.id] = root
+        roots.append(root)
+
+    for comment in comments:
+        comment.tree_replies = []
+
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id].tree_replies.append(comment)
+        else:
+            continue  # The parent is not published
+
+        nodes[comment.id] = comment
+
+    return roots
@@ -0,0 +1,43 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+class PostEvents:
+    """
+    Publishes post changes to channel-layer groups, for the GraphQL subscriptions
+    (see `posts.schema.subscriptions`).
+
+    Events are sent once the current transaction commits, so subscribers always read
+    the committed data, and carry IDs only: each subscriber loads what its query selects.
+    `postUpdated` events only say that the post changed, so subscribers may coalesce them
+    (`coalesce`); every `commentAdded` event is delivered.
+    """
+    EVENT_TYPE = 'graphql.event'
+
+    @staticmethod
+    def post_group(post_id):
+        return f'graphql.post.{post_id}'
+
+    @staticmethod
+    def comments_group(post_id):
+        return f'graphql.post.{post_id}.comments'
+
+    @classmethod
+    def send(cls, group, **ids):
+        """
+        Sends an event to the group once the current transaction commits.
+        """
+        def send_event():
+            async_to_sync(get_channel_layer().group_send)(group, {'type': cls.EVENT_TYPE, 'group': group, **ids})
+
+        # A failing channel layer must not fail the (already committed) write
+        transaction.on_commit(send_event, robust=True)
+
+    @classmethod
+    def post_updated(cls, post_id):
+        cls.send(cls.post_group(post_id), post_id=post_id, coalesce=True)
+
+    @classmethod
+    def comment_added(cls, comment):
+        cls.send(cls.comments_group(comment.post_id), post_id=comment.post_id, comment_id=comment.id)
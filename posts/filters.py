@@ -1,22 +1,113 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
-from posts.models import Post
+from rest_framework.filters import BaseFilterBackend
+from posts.models import Post, PostTag, Reaction, ReactionChoices
 
 
 class PostFilter(filters.FilterSet):
     """
     Filter for Posts by author username and tags.
+
+    Tag filters take comma-separated tag names and are built on `EXISTS` subqueries
+    over the `Tag.posts` through table, so no join or `DISTINCT` is needed:
+    - `tags_any` (or `tags`): posts having at least one of the tags.
+    - `tags_all`: posts having every one of the tags.
     """
 
     author = filters.CharFilter(field_name='author__username', lookup_expr='icontains')
-    tags = filters.CharFilter(method='filter_tags')
+    tags = filters.CharFilter(method='filter_tags_any')
+    tags_any = filters.CharFilter(method='filter_tags_any')
+    tags_all = filters.CharFilter(method='filter_tags_all')
 
     class Meta:
         model = Post
-        fields = ['author', 'tags']
+        fields = ['author', 'tags', 'tags_any', 'tags_all']
+
+    @staticmethod
+    def get_tag_names(value):
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    @staticmethod
+    def tagged_with(**lookups):
+        """
+        Returns an `EXISTS` condition matching posts that have a tag matching `lookups`.
+        """
+        return Exists(PostTag.objects.filter(post=OuterRef('pk'), **lookups))
+
+    def filter_tags_any(self, queryset, name, value):
+        """
+        Custom filter to filter posts having any of the tag names (comma-separated).
+        """
+        tag_names = self.get_tag_names(value)
+        if not tag_names:
+            return queryset
+        return queryset.filter(self.tagged_with(tag__name__in=tag_names))
+
+    def filter_tags_all(self, queryset, name, value):
+        """
+        Custom filter to filter posts having all the tag names (comma-separated).
+        """
+        for tag_name in self.get_tag_names(value):
+            queryset = queryset.filter(self.tagged_with(tag__name=tag_name))
+        return queryset
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over post captions.
+
+    Matches the `search` query parameter against the GIN-indexed `search_vector`
+    column and orders the results by `SearchRank`, best match first.
+    Pass `search_type=websearch` to use the web search syntax
+    (`"quoted phrases"`, `or`, `-excluded`), otherwise all words must match.
+    """
+    search_param = 'search'
+    search_type_param = 'search_type'
+    search_types = ('plain', 'phrase', 'websearch')
+
+    def get_search_query(self, request):
+        """
+        Returns the `SearchQuery` of the request, or None if there is no search term.
+        """
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return None
+
+        search_type = request.query_params.get(self.search_type_param)
+        if search_type not in self.search_types:
+            search_type = 'plain'
+
+        return SearchQuery(term, config=settings.POST_SEARCH_CONFIG, search_type=search_type)
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).filter(
+            search_vector=query
+        ).order_by('-search_rank', '-id')
 
-    def filter_tags(self, queryset, name, value):
+    def get_keyset_ordering(self, request, queryset, view):
         """
-        Custom filter to filter posts by tag names (comma-separated).
+        Makes `KeysetPagination` page over the rank instead of the creation time while searching.
         """
-        tag_names = value.split(',')
-        return queryset.filter(tags__name__in=tag_names).distinct()
+        if self.get_search_query(request) is None:
+            return None
+        return '-search_rank'
+
+
+class ReactionFilter(filters.FilterSet):
+    """
+    Filter for Reactions by type (`like` or `dislike`).
+    """
+
+    type = filters.ChoiceFilter(field_name='reaction_type', choices=ReactionChoices.choices)
+
+    class Meta:
+        model = Reaction
+        fields = ['type']
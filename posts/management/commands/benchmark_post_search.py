@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from posts.filters import PostSearchFilter
+from posts.models import Post, PostImageVariant, PostTag, Comment, Reaction, StatusChoices
+from .rebuild_search_vectors import rebuild_search_vectors
+
+from random import Random
+from statistics import median
+import time
+
+User = get_user_model()
+
+WORDS = (
+    'sunset beach mountain coffee morning city night rain travel friends family food pizza music '
+    'concert guitar summer winter snow forest river lake road trip weekend holiday birthday party '
+    'cat dog garden flower spring autumn book reading study exam work office code python django '
+    'football match goal team win game movie cinema art painting photo camera street market bread '
+    'tea breakfast lunch dinner sky cloud star moon sea boat island desert train station bike run'
+).split()
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the ranked full-text caption search against the previous `ILIKE` search.
+
+    Seeds a dataset of published posts owned by a dedicated benchmark user (1M by default),
+    then times the first page of results of both searches for the given term.
+    Run with `--cleanup` to delete the seeded posts afterwards.
+    """
+    help = 'Compare ranked full-text search with ILIKE caption search on a seeded dataset.'
+    benchmark_username = 'search_benchmark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000, help='Number of seeded posts.')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Posts inserted or deleted per statement.')
+        parser.add_argument('--term', default='sunset beach', help='Search term to benchmark.')
+        parser.add_argument('--runs', type=int, default=10, help='Timed runs per search.')
+        parser.add_argument('--page-size', type=int, default=20, help='Results fetched per search.')
+        parser.add_argument('--explain', action='store_true', help='Print the query plans.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded posts and exit.')
+
+    def handle(self, *args, **options):
+        author, _ = User.objects.get_or_create(
+            username=self.benchmark_username,
+            defaults={'mobile': '09000000000'}
+        )
+
+        if options['cleanup']:
+            deleted = self.cleanup(author, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{deleted} benchmark rows deleted.'))
+            return
+
+        self.seed(author, options['posts'], options['batch_size'])
+
+        term, page_size = options['term'], options['page_size']
+        published = Post.objects.filter(status=StatusChoices.PUBLISHED)
+        request = Request(APIRequestFactory().get('/', {'search': term}))
+
+        searches = {
+            'ILIKE (previous)': published.filter(caption__icontains=term).order_by('-created_at', '-id'),
+            'Full-text (ranked)': PostSearchFilter().filter_queryset(request, published, view=None),
+        }
+
+        for name, queryset in searches.items():
+            timings = self.measure(queryset[:page_size], options['runs'])
+            self.stdout.write(
+                f'{name:<20} min {min(timings):8.2f} ms | median {median(timings):8.2f} ms'
+            )
+            if options['explain']:
+                self.stdout.write(queryset[:page_size].explain(analyze=True))
+
+    def seed(self, author, count, batch_size):
+        """
+        Inserts published posts with random captions until the benchmark user owns `count` posts.
+        """
+        missing = count - Post.objects.filter(author=author).count()
+        if missing <= 0:
+            return
+
+        self.stdout.write(f'Seeding {missing} posts...')
+        random = Random(count)  # Deterministic captions for comparable runs
+
+        while missing > 0:
+            size = min(batch_size, missing)
+            Post.objects.bulk_create([
+                Post(
+                    image='posts/benchmark.jpg',
+                    caption=' '.join(random.choices(WORDS, k=12)),
+                    author=author,
+                    status=StatusChoices.PUBLISHED
+                )
+                for _ in range(size)
+            ])
+            missing -= size
+
+        # Bulk inserts skip the signals, so fill the search vectors explicitly
+        rebuild_search_vectors(
+            Post.objects.filter(author=author, search_vector__isnull=True),
+            batch_size
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Post._meta.db_table}')
+
+    def cleanup(self, author, batch_size):
+        """
+        Deletes the posts of the benchmark user in primary key batches, and returns the number of deleted rows.
+
+        Rows are deleted with plain `DELETE` statements, without loading them or sending
+        `post_delete` signals: seeded posts share an untracked image and are never cached,
+        so the receivers would have nothing to release. Rows referencing a batch are deleted
+        in the same transaction.
+        """
+        post_ids = Post.objects.filter(author=author).order_by('id').values_list('id', flat=True)
+        deleted = 0
+
+        while batch := list(post_ids[:batch_size]):
+            with transaction.atomic():
+                for queryset in (
+                    Reaction.objects.filter(Q(post_id__in=batch) | Q(comment__post_id__in=batch)),
+                    Comment.objects.filter(post_id__in=batch),
+                    PostTag.objects.filter(post_id__in=batch),
+                    PostImageVariant.objects.filter(post_id__in=batch),
+                    Post.objects.filter(id__in=batch),
+                ):
+                    deleted += queryset._raw_delete(queryset.db)
+
+        return deleted
+
+    def measure(self, queryset, runs):
+        """
+        Returns the wall-clock time (in milliseconds) of evaluating `queryset` `runs` times.
+        """
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            list(queryset.all())  # `.all()` clones the queryset, so nothing is cached between runs
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return timings
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment
+
+
+class Command(BaseCommand):
+    """
+    Fills the materialized paths (`path`, `depth`) of existing comments.
+
+    New comments get their path when they are saved, and missing paths are filled after
+    every `migrate` (see `posts.signals`); this command rebuilds them on demand, e.g. for
+    comments inserted in bulk.
+    Comments are processed post by post, and each post is saved with one bulk update.
+    """
+    help = 'Rebuild the materialized paths of comment threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of comments updated per statement.')
+        parser.add_argument('--missing-only', action='store_true', help='Only rebuild posts having comments without a path.')
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.all()
+        if options['missing_only']:
+            comments = comments.filter(path='')
+
+        post_ids = comments.order_by('post_id').values_list('post_id', flat=True).distinct()
+        updated = 0
+
+        for post_id in post_ids.iterator():
+            updated += Comment.rebuild_paths(post_id, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} comment paths rebuilt.'))
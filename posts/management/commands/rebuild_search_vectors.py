@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the full-text search vectors of post captions.
+
+    New and edited posts are kept up to date by `posts.signals`, but rows written
+    without signals (bulk inserts, raw SQL, posts created before the column existed)
+    need a backfill. Rows are processed in primary key ranges, one `UPDATE` per batch.
+    """
+    help = 'Recompute the full-text search vectors of posts in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows updated per statement.')
+        parser.add_argument('--missing-only', action='store_true', help='Only fill posts without a search vector.')
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        if options['missing_only']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        updated = rebuild_search_vectors(queryset, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{updated} search vectors rebuilt.'))
+
+
+def rebuild_search_vectors(queryset, batch_size):
+    """
+    Recomputes the search vectors of `queryset` in primary key ranges of `batch_size` rows.
+    """
+    last_id = queryset.order_by('-id').values_list('id', flat=True).first() or 0
+    first_id = queryset.order_by('id').values_list('id', flat=True).first() or 0
+    updated = 0
+
+    for start in range(first_id, last_id + 1, batch_size):
+        updated += queryset.filter(
+            id__gte=start,
+            id__lt=start + batch_size
+        ).update(search_vector=Post.build_search_vector())
+
+    return updated
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.cache import PostDetailCache
+from posts.models import Post, Comment, Reaction, ReactionChoices
+from posts.schema.cache import GraphQLResponseCache
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized reaction counters of posts and comments,
+    and the reply counters of comments.
+
+    The counters are maintained incrementally by `ReactionToggleView` (and `posts.signals`),
+    but they can drift when rows are changed outside of them (e.g. cascading user deletes,
+    bulk updates or the admin).
+    Rows are processed in primary key ranges, and only the drifted rows of a batch are
+    updated, in one `UPDATE`, so the command never holds long locks on the whole table.
+    Updates send no signals, so the cached details of the affected posts and the cached
+    GraphQL responses selecting posts or comments are invalidated here.
+    """
+    help = 'Recompute likes/dislikes counters of posts and comments, and reply counters of comments, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows updated per statement.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model, target in ((Post, 'post'), (Comment, 'comment')):
+            updated = self.reconcile(model, target, batch_size)
+            if updated:
+                GraphQLResponseCache.invalidate(model)
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}: {updated} rows reconciled.'))
+
+    def count_subquery(self, target, reaction_type):
+        """
+        Builds a correlated subquery counting the reactions of one type on the outer row.
+        """
+        reactions = Reaction.objects.filter(
+            **{target: OuterRef('pk')},
+            reaction_type=reaction_type
+        ).order_by().values(target).annotate(total=Count('id')).values('total')
+
+        return Coalesce(Subquery(reactions, output_field=IntegerField()), 0)
+
+    def reconcile(self, model, target, batch_size):
+        """
+        Recomputes the drifted counters of `model` in primary key ranges of `batch_size` rows,
+        and returns the number of rows fixed.
+        """
+        last_id = model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        post_field = 'id' if model is Post else 'post_id'
+        updated = 0
+
+        counters = {
+            'likes_count': self.count_subquery(target, ReactionChoices.LIKE),
+            'dislikes_count': self.count_subquery(target, ReactionChoices.DISLIKE),
+        }
+        if model is Comment:
+            counters['reply_count'] = Comment.reply_count_subquery()
+
+        drifted = Q()
+        for field in counters:
+            drifted |= ~Q(**{field: F(f'expected_{field}')})
+
+        for start in range(0, last_id + 1, batch_size):
+            rows = model.objects.filter(
+                id__gte=start,
+                id__lt=start + batch_size
+            ).alias(**{f'expected_{field}': counter for field, counter in counters.items()}).filter(drifted)
+
+            rows = list(rows.values_list('id', post_field))
+            if not rows:
+                continue
+
+            updated += model.objects.filter(id__in=[row_id for row_id, _ in rows]).update(**counters)
+            PostDetailCache.invalidate(*{post_id for _, post_id in rows})
+
+        return updated
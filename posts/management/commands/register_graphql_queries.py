@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from graphql import parse
+from graphql.error import GraphQLSyntaxError
+from graphql.validation import validate
+
+from social_media_project.graphql_persisted import PersistedQueries
+from social_media_project.graphql_view import SocialGraphQLView
+from social_media_project.schema import schema
+
+
+class Command(BaseCommand):
+    """
+    Registers the operations of the clients as persisted GraphQL queries.
+
+    Each file holds one query document (e.g. the `.graphql` files of the mobile app).
+    Documents are validated against the schema first, and registered without expiry,
+    so they are accepted when `GRAPHQL_PERSISTED_QUERIES_ONLY` is on.
+    """
+    help = 'Register GraphQL query documents as persisted queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Files containing the query documents.')
+
+    def handle(self, *args, **options):
+        queries = []
+        for path in options['files']:
+            with open(path) as file:
+                query = file.read()
+
+            try:
+                errors = validate(schema.graphql_schema, parse(query), SocialGraphQLView.validation_rules)
+            except GraphQLSyntaxError as e:
+                errors = [e]
+            if errors:
+                raise CommandError(f'{path}: {errors[0].message}')
+
+            queries.append((path, query))
+
+        for path, query in queries:
+            self.stdout.write(f'{PersistedQueries.register(query)}  {path}')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(queries)} persisted queries registered.'))
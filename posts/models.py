@@ -1,9 +1,23 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Greatest, Substr, Upper
 from django.contrib.auth import get_user_model
+from utils.storage import ContentAddressedStorage
+from .cache import PostDetailCache
+from .events import PostEvents
+from .reaction_buffer import ReactionBuffer
+from .schema.cache import GraphQLResponseCache
+
+import re
 
 User = get_user_model()
 
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
 
 class StatusChoices(models.TextChoices):
     """
@@ -21,39 +35,310 @@ class ReactionChoices(models.TextChoices):
     DISLIKE = 'dislike', 'Dislike'
 
 
-class Post(models.Model):
+class ImageVariantChoices(models.TextChoices):
+    """
+    Choices for the resized variants of a post image.
+    """
+    THUMBNAIL = 'thumbnail', 'Thumbnail'
+    FEED = 'feed', 'Feed'
+    FULL = 'full', 'Full'
+
+
+class ImageFormatChoices(models.TextChoices):
+    """
+    Choices for the encoding of post image variants.
+    """
+    WEBP = 'webp', 'WebP'
+    JPEG = 'jpeg', 'JPEG'
+
+
+class ImageBlob(models.Model):
+    """
+    Counts the posts referencing a stored image file.
+
+    Post images are content-addressed (see `utils.storage.ContentAddressedStorage`),
+    so identical uploads share one file. The file is deleted when the last post
+    referencing it is deleted or changes its image.
+    """
+    name = models.CharField(max_length=255, unique=True)  # File name in the storage
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count} refs)'
+
+    @classmethod
+    def acquire(cls, name):
+        """
+        Adds a reference to the file.
+        """
+        blob, created = cls.objects.get_or_create(name=name, defaults={'ref_count': 1})
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    @classmethod
+    def release(cls, name, storage):
+        """
+        Removes a reference to the file, and deletes the file once nothing references it.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(name=name).first()
+            if not blob:
+                return  # Not tracked (e.g. stored before deduplication), so never delete it
+
+            if blob.ref_count > 1:
+                cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+
+            blob.delete()
+
+        def delete_file():
+            # The same content may have been uploaded again in the meantime
+            if not cls.objects.filter(name=name).exists():
+                storage.delete(name)
+
+        transaction.on_commit(delete_file)
+
+
+class DenormalizedFieldsMixin:
+    """
+    Leaves the `denormalized_fields` out when an existing row is saved.
+
+    Those columns are only changed with `UPDATE` statements (`F()` counters, materialized paths),
+    so saving an instance loaded before such an update (e.g. by an edit request) would write
+    their stale values back and lose it.
+    """
+    denormalized_fields = ()
+
+    def save(self, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.denormalized_fields
+            ]
+        super().save(**kwargs)
+
+
+class Post(DenormalizedFieldsMixin, models.Model):
     """
     Represents a post made by a user.
+
+    Images are stored once per distinct content and shared between posts.
     """
-    image = models.ImageField(upload_to='posts/')
+    denormalized_fields = ('likes_count', 'dislikes_count', 'search_vector')
+
+    image = models.ImageField(upload_to='posts/', storage=ContentAddressedStorage())
     caption = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     status = models.CharField(max_length=10, choices=StatusChoices.choices, default=StatusChoices.DRAFT)
+    likes_count = models.PositiveIntegerField(default=0)  # Denormalized, kept in sync by `ReactionToggleView`
+    dislikes_count = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)  # Kept up to date by `posts.signals`
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the `(created_at, id)` keyset pagination of published posts
+            models.Index(fields=['status', 'created_at', 'id'], name='post_status_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ]
+
     def __str__(self):
         return f'Post_{self.id}'
 
+    @staticmethod
+    def build_search_vector():
+        """
+        Returns the expression computing the full-text search vector of a post caption.
+        """
+        return SearchVector('caption', config=settings.POST_SEARCH_CONFIG)
+
+    @staticmethod
+    def extract_hashtags(caption):
+        """
+        Returns the unique hashtag names (without `#`) found in a caption, in order of appearance.
+        """
+        max_length = Tag._meta.get_field('name').max_length
+        return list(dict.fromkeys(name for name in HASHTAG_PATTERN.findall(caption or '') if len(name) <= max_length))
+
+    def set_tags(self, tag_names, clear=True):
+        """
+        Assigns tags to the post by name, creating the missing tags.
+
+        Tags are resolved in bulk and the through rows are inserted with a single statement.
+        If `clear` is True, tags not in `tag_names` are removed from the post.
+        """
+        tags = Tag.get_or_create_many(tag_names)
+
+        if clear:
+            PostTag.objects.filter(post=self).exclude(tag__in=tags).delete()
+
+        PostTag.objects.bulk_create(
+            [PostTag(post=self, tag=tag) for tag in tags],
+            ignore_conflicts=True  # Skip tags the post already has
+        )
+
+        # Bulk inserts send no signals
+        PostDetailCache.invalidate(self.pk, lists=True)
+        GraphQLResponseCache.invalidate(Post, Tag)
 
-class Comment(models.Model):
+
+class PostImageVariant(models.Model):
+    """
+    A resized, metadata-free copy of a post image.
+
+    Variants are generated in the background by `posts.tasks.generate_image_variants`
+    after a post image is uploaded, so clients can download a size fitting their screen.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="image_variants")
+    kind = models.CharField(max_length=10, choices=ImageVariantChoices.choices)
+    image_format = models.CharField(max_length=10, choices=ImageFormatChoices.choices)
+    image = models.ImageField(upload_to='posts/variants/')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('post', 'kind', 'image_format')
+
+    def __str__(self):
+        return f'{self.post} - {self.kind} ({self.image_format})'
+
+
+class Comment(DenormalizedFieldsMixin, models.Model):
     """
     Represents a comment on a post.
 
     A comment can be a direct comment or a reply to another comment.
+    `reply_count` counts the published direct replies, so clients know which
+    replies to load on demand.
+
+    Threads are also stored as a materialized path: `path` is the path of the parent
+    followed by the comment ID in fixed-width base 36, compared byte-wise (`C` collation).
+    Ordering by path lists a thread depth-first in display order, and a subtree is a
+    single range scan of the `(post, path)` index (`path__startswith=<root path>`).
     """
+    PATH_SEGMENT_LENGTH = 8  # Base 36 digits per comment ID, enough for 2.8 trillion comments
+    denormalized_fields = ('likes_count', 'dislikes_count', 'reply_count', 'path', 'depth')
+
     parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name="replies", null=True, blank=True)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     content = models.TextField()
     status = models.CharField(max_length=10, choices=StatusChoices.choices, default=StatusChoices.DRAFT)
+    likes_count = models.PositiveIntegerField(default=0)  # Denormalized, kept in sync by `ReactionToggleView`
+    dislikes_count = models.PositiveIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)  # Denormalized, kept in sync by `posts.signals`
+    path = models.TextField(db_collation='C', blank=True, editable=False)  # Filled by `posts.signals`
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)  # 0 for top-level comments
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs the `(created_at, id)` keyset pagination of replies
+            models.Index(fields=['parent', 'created_at', 'id'], name='comment_parent_created_id_idx'),
+            # Backs thread rendering and subtree lookups in path order
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ]
+
     def __str__(self):
         if self.parent:
             return f"Reply by '{self.author}' to comment {self.parent.id}"
         return f"Comment by '{self.author}' on '{self.post}'"
 
+    @classmethod
+    def path_segment(cls, comment_id):
+        """
+        Encodes a comment ID as a fixed-width base 36 path segment, so paths sort like the IDs.
+        """
+        digits = ''
+        while comment_id:
+            comment_id, digit = divmod(comment_id, 36)
+            digits = '0123456789abcdefghijklmnopqrstuvwxyz'[digit] + digits
+        return digits.rjust(cls.PATH_SEGMENT_LENGTH, '0')
+
+    def build_path(self, parent_path=''):
+        return f'{parent_path}{self.path_segment(self.id)}'
+
+    def set_path(self):
+        """
+        Computes the path and depth of the comment from its parent and saves them.
+
+        The comment's replies (if it was moved to another parent) are moved along
+        with a single `UPDATE` of the whole subtree.
+        """
+        parent = Comment.objects.filter(id=self.parent_id).values('path', 'depth').first()
+        old_path, old_depth = self.path, self.depth
+        self.path = self.build_path(parent['path'] if parent else '')
+        self.depth = parent['depth'] + 1 if parent else 0
+
+        if old_path == self.path:
+            return
+
+        Comment.objects.filter(id=self.id).update(path=self.path, depth=self.depth)
+        if old_path:
+            Comment.objects.filter(path__startswith=old_path).exclude(id=self.id).update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth)
+            )
+
+    def get_subtree(self):
+        """
+        Returns the comment and all of its (nested) replies, in display order.
+
+        Raises `ValueError` if the path of the comment is not filled yet, since
+        an empty prefix would match every comment of the post.
+        """
+        if not self.path:
+            raise ValueError(f'Comment {self.pk} has no materialized path.')
+        return Comment.objects.filter(post_id=self.post_id, path__startswith=self.path).order_by('path')
+
+    @classmethod
+    def rebuild_paths(cls, post_id, batch_size=1000):
+        """
+        Recomputes the paths and depths of every comment of a post from the parent links,
+        saving the changed ones with a bulk update. Returns the number of changed comments.
+        """
+        comments = cls.objects.filter(post_id=post_id).only('id', 'parent_id', 'path', 'depth').order_by('id')
+        paths = {}
+        changed = []
+
+        # Replies are always newer than their parents, so parents get their path first
+        for comment in comments:
+            parent = paths.get(comment.parent_id)
+            path = comment.build_path(parent[0] if parent else '')
+            depth = parent[1] + 1 if parent else 0
+            paths[comment.id] = (path, depth)
+
+            if (comment.path, comment.depth) != (path, depth):
+                comment.path, comment.depth = path, depth
+                changed.append(comment)
+
+        cls.objects.bulk_update(changed, ['path', 'depth'], batch_size=batch_size)
+        return len(changed)
+
+    @staticmethod
+    def reply_count_subquery():
+        """
+        Builds a correlated subquery counting the published replies of the outer comment.
+        """
+        replies = Comment.objects.filter(
+            parent=OuterRef('pk'),
+            status=StatusChoices.PUBLISHED
+        ).order_by().values('parent').annotate(total=Count('id')).values('total')
+
+        return Coalesce(Subquery(replies, output_field=models.IntegerField()), 0)
+
+    @staticmethod
+    def update_reply_counts(*comment_ids):
+        """
+        Recomputes the `reply_count` of the given comments with a single statement.
+        """
+        comment_ids = {comment_id for comment_id in comment_ids if comment_id}
+        if comment_ids:
+            Comment.objects.filter(id__in=comment_ids).update(reply_count=Comment.reply_count_subquery())
+
 
 class Reaction(models.Model):
     """
@@ -67,18 +352,194 @@ class Reaction(models.Model):
 
     class Meta:
         unique_together = ('user', 'post', 'comment')  # Each user can react only once to a post or comment.
+        indexes = [
+            # Cover the "who reacted" lists (`user` is included, so no table lookups are needed)
+            models.Index(
+                fields=['post', 'reaction_type', 'created_at', 'id'],
+                include=['user'],
+                name='reaction_post_type_idx'
+            ),
+            models.Index(
+                fields=['comment', 'reaction_type', 'created_at', 'id'],
+                include=['user'],
+                name='reaction_comment_type_idx'
+            ),
+        ]
 
     def __str__(self):
         target = self.post if self.post else self.comment
         return f"{self.reaction_type.capitalize()} by '{self.user}' on '{target}'"
 
+    @staticmethod
+    def counter_field(reaction_type):
+        """
+        Returns the name of the denormalized counter column for the given reaction type.
+        """
+        if reaction_type == ReactionChoices.LIKE:
+            return 'likes_count'
+        return 'dislikes_count'
+
+    @staticmethod
+    def update_counters(post_id=None, comment_id=None, **deltas):
+        """
+        Atomically applies counter deltas (e.g. `likes_count=1`) to the reacted post or comment.
+
+        The update is done with `F()` expressions in a single statement, so concurrent
+        reactions never overwrite each other's counts.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        target = Post.objects.filter(id=post_id) if post_id else Comment.objects.filter(id=comment_id)
+        target.update(**{
+            field: Greatest(F(field) + delta, 0)  # Never drop below zero, even if counts drifted
+            for field, delta in deltas.items()
+        })
+
+    @classmethod
+    def get_user_reactions(cls, user, post_ids=(), comment_ids=()):
+        """
+        Returns the reactions of the user to the given posts and comments with a single query,
+        as `{'post:<id>': reaction_type, 'comment:<id>': reaction_type}`.
+
+        Toggles still buffered in Redis (see `ReactionBuffer`) take precedence.
+        """
+        if not user.is_authenticated or not (post_ids or comment_ids):
+            return {}
+
+        reactions = {
+            ReactionBuffer.target(post_id, comment_id): reaction_type
+            for post_id, comment_id, reaction_type in cls.objects.filter(
+                Q(post_id__in=post_ids) | Q(comment_id__in=comment_ids),
+                user=user
+            ).values_list('post_id', 'comment_id', 'reaction_type')
+        }
+
+        if settings.REACTION_WRITE_BEHIND:
+            targets = [ReactionBuffer.target(post_id=post_id) for post_id in post_ids]
+            targets += [ReactionBuffer.target(comment_id=comment_id) for comment_id in comment_ids]
+            reactions.update(ReactionBuffer.get_user_states(targets, user.id))
+
+        return reactions
+
+    @classmethod
+    def apply_buffered(cls, states, post_id=None, comment_id=None):
+        """
+        Saves buffered reactions (`{user_id: reaction_type or None}`) of a post or comment.
+
+        The stored reactions are compared with the buffered ones, and the differences are
+        written with one insert, one update and one delete, plus a single counters update.
+        Returns the number of changed reactions.
+        """
+        target = {'post_id': post_id, 'comment_id': comment_id}
+        model = Post if post_id else Comment
+        if not model.objects.filter(id=post_id or comment_id).exists():
+            return 0  # The target was deleted in the meantime
+
+        # Users may have been deleted in the meantime as well
+        user_ids = set(User.objects.filter(id__in=states).values_list('id', flat=True))
+
+        with transaction.atomic():
+            existing = {
+                reaction.user_id: reaction
+                for reaction in cls.objects.select_for_update().filter(user_id__in=user_ids, **target)
+            }
+            to_create, to_update, to_delete = [], [], []
+            deltas = {}
+
+            for user_id in user_ids:
+                reaction, reaction_type = existing.get(user_id), states[user_id]
+                if (reaction.reaction_type if reaction else None) == reaction_type:
+                    continue
+
+                if reaction:
+                    field = cls.counter_field(reaction.reaction_type)
+                    deltas[field] = deltas.get(field, 0) - 1
+                if reaction_type:
+                    field = cls.counter_field(reaction_type)
+                    deltas[field] = deltas.get(field, 0) + 1
+
+                if not reaction:
+                    to_create.append(cls(user_id=user_id, reaction_type=reaction_type, **target))
+                elif not reaction_type:
+                    to_delete.append(reaction.pk)
+                else:
+                    reaction.reaction_type = reaction_type
+                    to_update.append(reaction)
+
+            cls.objects.bulk_create(to_create)
+            cls.objects.bulk_update(to_update, ['reaction_type'])
+            cls.objects.filter(pk__in=to_delete).delete()
+            cls.update_counters(**target, **deltas)
+
+        # Bulk writes send no signals (counters are left to their cache hints, see `posts.signals`)
+        post_id = post_id or Comment.objects.filter(id=comment_id).values_list('post_id', flat=True).first()
+        PostDetailCache.invalidate(post_id)
+        PostEvents.post_updated(post_id)
+        GraphQLResponseCache.invalidate(Reaction)
+
+        return len(to_create) + len(to_update) + len(to_delete)
+
 
 class Tag(models.Model):
     """
     Tags are used to categorize or label posts. A post can have multiple tags.
     """
     name = models.CharField(max_length=50, unique=True)
-    posts = models.ManyToManyField(Post, related_name="tags", blank=True)
+    posts = models.ManyToManyField(Post, related_name="tags", blank=True, through='PostTag')
+
+    class Meta:
+        indexes = [
+            # Serves `icontains` and trigram similarity searches on tag names
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='tag_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def get_or_create_many(cls, names):
+        """
+        Returns the tags with the given names, creating the missing ones.
+
+        Costs a single query when all the tags exist. Missing tags are created with one
+        `INSERT ... ON CONFLICT DO NOTHING`, so concurrent creations of the same tag don't fail.
+        """
+        names = set(names)
+        if not names:
+            return []
+
+        tags = list(cls.objects.filter(name__in=names))
+        missing = names - {tag.name for tag in tags}
+
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            tags += cls.objects.filter(name__in=missing)
+
+        return tags
+
+
+class PostTag(models.Model):
+    """
+    Links a tag to a post (the `Tag.posts` through table).
+
+    Keeps the table and columns of the implicit many-to-many table, and adds
+    a `(post, tag)` index so per-post tag lookups (e.g. `EXISTS` filters) are index-only.
+
+    The table already exists on databases created with the implicit through model,
+    so there the migration switching `Tag.posts` to it must be state-only
+    (`SeparateDatabaseAndState`), keeping only the new index as a database operation.
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'posts_tag_posts'
+        unique_together = ('tag', 'post')
+        indexes = [
+            models.Index(fields=['post', 'tag'], name='posttag_post_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f"'{self.tag}' on '{self.post}'"
@@ -0,0 +1,165 @@
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+
+class ReactionBuffer:
+    """
+    Buffers reaction toggles in Redis (write-behind), used when `REACTION_WRITE_BEHIND` is on.
+
+    Every reacted post or comment ("target") has a hash mapping user IDs to their latest
+    reaction (`like`, `dislike`, or `none` once removed), and the targets with unsaved
+    toggles are kept in a set. The `flush_reaction_buffer` task periodically moves each
+    hash aside (to a `:flushing` key, so new toggles keep landing in a fresh hash) and
+    applies it to Postgres in batches, see `Reaction.apply_buffered`.
+    """
+    DIRTY_KEY = 'reactions:dirty'
+    REMOVED = 'none'
+
+    @staticmethod
+    def get_connection():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def target(post_id=None, comment_id=None):
+        return f'post:{post_id}' if post_id else f'comment:{comment_id}'
+
+    @staticmethod
+    def target_ids(target):
+        """
+        Returns the `post_id`/`comment_id` lookups of a target.
+        """
+        kind, target_id = target.split(':')
+        return {
+            'post_id': int(target_id) if kind == 'post' else None,
+            'comment_id': int(target_id) if kind == 'comment' else None,
+        }
+
+    @staticmethod
+    def buffer_key(target):
+        return f'reactions:buffer:{target}'
+
+    @classmethod
+    def flushing_key(cls, target):
+        return f'{cls.buffer_key(target)}:flushing'
+
+    @classmethod
+    def get_state(cls, target, user_id):
+        """
+        Returns the buffered reaction of the user (`none` if removed),
+        or None if the user has no unsaved toggle on the target.
+        """
+        pipe = cls.get_connection().pipeline(transaction=False)
+        pipe.hget(cls.buffer_key(target), user_id)
+        pipe.hget(cls.flushing_key(target), user_id)
+
+        for state in pipe.execute():  # Newest toggle first
+            if state is not None:
+                return state.decode()
+        return None
+
+    @classmethod
+    def get_user_states(cls, targets, user_id):
+        """
+        Returns the buffered reactions of the user to the given targets in one round trip,
+        as `{target: reaction_type}` where removed reactions are None.
+        """
+        pipe = cls.get_connection().pipeline(transaction=False)
+        for target in targets:
+            pipe.hget(cls.buffer_key(target), user_id)
+            pipe.hget(cls.flushing_key(target), user_id)
+
+        results = pipe.execute()
+        states = {}
+        for target, state, flushing_state in zip(targets, results[::2], results[1::2]):
+            state = state if state is not None else flushing_state  # Newest toggle first
+            if state is not None:
+                states[target] = None if state.decode() == cls.REMOVED else state.decode()
+
+        return states
+
+    @classmethod
+    def set_state(cls, target, user_id, reaction_type):
+        """
+        Buffers the latest reaction of the user (None to remove it) and marks the target dirty.
+        """
+        pipe = cls.get_connection().pipeline(transaction=False)
+        pipe.hset(cls.buffer_key(target), user_id, reaction_type or cls.REMOVED)
+        pipe.sadd(cls.DIRTY_KEY, target)
+        pipe.execute()
+
+    @classmethod
+    def toggle(cls, target, user_id, reaction_type, get_stored):
+        """
+        Toggles the reaction of the user to the target: removes it if it already is `reaction_type`,
+        otherwise sets it, and marks the target dirty. Returns the previous reaction (or None).
+
+        `get_stored()` returns the saved reaction, used when the user has no unsaved toggle.
+        The read and the write run in one `WATCH`/`MULTI` transaction, retried if a concurrent
+        toggle or flush changes the target's hashes in between, so no toggle is lost.
+        """
+        buffer_key, flushing_key = cls.buffer_key(target), cls.flushing_key(target)
+
+        def toggle_state(pipe):
+            state = pipe.hget(buffer_key, user_id)
+            if state is None:
+                state = pipe.hget(flushing_key, user_id)
+
+            if state is None:  # No unsaved toggle, the stored reaction is current
+                current = get_stored()
+            else:
+                current = None if state.decode() == cls.REMOVED else state.decode()
+
+            pipe.multi()
+            pipe.hset(buffer_key, user_id, cls.REMOVED if current == reaction_type else reaction_type)
+            pipe.sadd(cls.DIRTY_KEY, target)
+            return current
+
+        return cls.get_connection().transaction(toggle_state, buffer_key, flushing_key, value_from_callable=True)
+
+    @classmethod
+    def pop_dirty_targets(cls, count):
+        """
+        Removes and returns up to `count` targets with unsaved toggles.
+        """
+        return [target.decode() for target in cls.get_connection().spop(cls.DIRTY_KEY, count) or []]
+
+    @classmethod
+    def mark_dirty(cls, *targets):
+        cls.get_connection().sadd(cls.DIRTY_KEY, *targets)
+
+    @classmethod
+    def begin_flush(cls, target):
+        """
+        Moves the buffered toggles of the target aside and returns them as `{user_id: reaction_type}`,
+        where removed reactions are None.
+
+        Toggles left aside by a failed flush are returned (again) before taking new ones.
+        """
+        connection = cls.get_connection()
+        flushing_key = cls.flushing_key(target)
+
+        if not connection.exists(flushing_key):
+            try:
+                connection.rename(cls.buffer_key(target), flushing_key)
+            except ResponseError:
+                return {}  # Nothing buffered (already flushed)
+
+        return {
+            int(user_id): None if state.decode() == cls.REMOVED else state.decode()
+            for user_id, state in connection.hgetall(flushing_key).items()
+        }
+
+    @classmethod
+    def end_flush(cls, target):
+        """
+        Drops the toggles of the target once they are saved.
+
+        If the flush took a hash left aside by a failed flush, newer toggles are still in the
+        buffer and their dirty mark was popped with this run, so the target is marked again.
+        """
+        pipe = cls.get_connection().pipeline(transaction=False)
+        pipe.delete(cls.flushing_key(target))
+        pipe.exists(cls.buffer_key(target))
+
+        if pipe.execute()[1]:
+            cls.mark_dirty(target)
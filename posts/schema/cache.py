@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from graphql import ExecutionContext, ExecutionResult, get_named_type
+from graphql.language import FieldNode, FragmentDefinitionNode, FragmentSpreadNode
+
+import hashlib
+import json
+import uuid
+
+
+class GraphQLResponseCache:
+    """
+    Caches the responses of anonymous GraphQL queries, keyed by the query hash, the operation
+    name and the normalized variables (coerced, with their defaults).
+
+    Every model behind the types selected by an operation (e.g. `posts.Post` for `PostType`)
+    is a tag with a version token, also part of the key: writes replace the tokens of the
+    models they change (see `invalidate`), so only the responses selecting them miss.
+
+    Responses are kept for the smallest `GRAPHQL_CACHE_HINTS` max-age of the selected fields
+    (`'Type.field': seconds`), or `GRAPHQL_RESPONSE_CACHE_TIMEOUT`. Fields hinted with 0
+    depend on the viewer, and the operations selecting them are never cached.
+    """
+    VERSION_TIMEOUT = 60 * 60 * 24  # Expired versions only cost a miss
+
+    @staticmethod
+    def version_key(tag):
+        return f'graphql:tag:{tag}:version'
+
+    @staticmethod
+    def response_key(query_hash, variant):
+        return f'graphql:response:{query_hash}:{hashlib.sha256(variant.encode()).hexdigest()}'
+
+    @staticmethod
+    def is_cacheable_request(request):
+        """
+        Returns whether the response can be shared, i.e. the client is anonymous.
+        """
+        return not request.user.is_authenticated and 'Authorization' not in request.headers
+
+    @classmethod
+    def get_versions(cls, tags):
+        """
+        Returns the current version tokens of the tags, creating the missing ones.
+        """
+        keys = [cls.version_key(tag) for tag in sorted(tags)]
+        versions = cache.get_many(keys)
+
+        for key in keys:
+            if key not in versions:
+                token = uuid.uuid4().hex
+                # Keep the token of a concurrent request, if it won
+                versions[key] = token if cache.add(key, token, timeout=cls.VERSION_TIMEOUT) else cache.get(key, token)
+
+        return [versions[key] for key in keys]
+
+    @classmethod
+    def invalidate(cls, *models):
+        """
+        Replaces the version tokens of the models once the current transaction commits,
+        so the cached responses selecting them are not served anymore.
+        """
+        tokens = {cls.version_key(model._meta.label): uuid.uuid4().hex for model in models}
+        transaction.on_commit(lambda: cache.set_many(tokens, timeout=cls.VERSION_TIMEOUT))
+
+    @classmethod
+    def get_plan(cls, document, selection_set, parent_type, fragments=None):
+        """
+        Returns the `(tags, max_age)` of a selection set on `parent_type`.
+        """
+        if fragments is None:
+            fragments = {
+                definition.name.value: definition
+                for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+            }
+
+        tags, max_age = set(), settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT
+
+        for selection in selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                # Fragments only ever narrow the type down, and the schema has no abstract types
+                fragment = fragments[selection.name.value] if isinstance(selection, FragmentSpreadNode) else selection
+                fragment_tags, fragment_max_age = cls.get_plan(document, fragment.selection_set, parent_type, fragments)
+                tags |= fragment_tags
+                max_age = min(max_age, fragment_max_age)
+                continue
+
+            name = selection.name.value
+            fields = getattr(parent_type, 'fields', {})
+            if name not in fields:
+                continue  # Introspection
+
+            max_age = min(max_age, settings.GRAPHQL_CACHE_HINTS.get(f'{parent_type.name}.{name}', max_age))
+
+            named_type = get_named_type(fields[name].type)
+            model = getattr(getattr(getattr(named_type, 'graphene_type', None), '_meta', None), 'model', None)
+            if model is not None:
+                tags.add(model._meta.label)
+
+            if selection.selection_set:
+                field_tags, field_max_age = cls.get_plan(document, selection.selection_set, named_type, fragments)
+                tags |= field_tags
+                max_age = min(max_age, field_max_age)
+
+        return tags, max_age
+
+    @classmethod
+    def get_or_execute(cls, schema, document, query_hash, operation_name, variables, execute):
+        """
+        Returns the cached result of a query operation, calling `execute()` to fill it if missing.
+        """
+        context = ExecutionContext.build(schema, document, raw_variable_values=variables, operation_name=operation_name)
+        if isinstance(context, list):
+            return execute()  # Reports the invalid variables
+
+        tags, max_age = cls.get_plan(document, context.operation.selection_set, schema.query_type)
+        if max_age <= 0:
+            return execute()
+
+        variant = json.dumps(
+            [operation_name, context.variable_values, cls.get_versions(tags)], sort_keys=True, default=str
+        )
+        key = cls.response_key(query_hash, variant)
+
+        data = cache.get(key)
+        if data is not None:
+            return ExecutionResult(data=data)
+
+        result = execute()
+        if not result.errors:
+            cache.set(key, result.data, timeout=max_age)
+        return result
@@ -0,0 +1,89 @@
+from django.conf import settings
+from graphql import GraphQLError
+from utils.pagination import decode_position, encode_position, seek
+from .types import PostType, TagType
+
+import graphene
+
+
+class KeysetConnection(graphene.relay.Connection):
+    """
+    Relay connection paginated with `(<ordering field>, id)` keyset cursors, like `KeysetPagination`.
+
+    `first` defaults to `GRAPHQL_DEFAULT_LIST_SIZE` and is capped at `GRAPHQL_MAX_LIST_SIZE`
+    (the sizes `QueryCostRule` prices connections with), and `after` seeks right past the cursor,
+    so every page is served by the same composite index whatever its depth.
+    `totalCount` costs a `COUNT(*)`, run only when it is selected.
+    """
+    ordering = '-created_at'  # The `id` column is always used as the tiebreaker
+    invalid_cursor_message = 'Invalid cursor'
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int(required=True)
+
+    def resolve_total_count(self, info):
+        return self.queryset.count()
+
+    @classmethod
+    def get_field(cls):
+        return cls.ordering.lstrip('-')
+
+    @classmethod
+    def decode_cursor(cls, cursor, model):
+        try:
+            position = decode_position(cursor, model, cls.get_field())
+        except ValueError:
+            raise GraphQLError(cls.invalid_cursor_message)
+
+        if position['reverse']:
+            raise GraphQLError(cls.invalid_cursor_message)  # Connections only page forward
+        return position['value'], position['id']
+
+    @classmethod
+    def paginate(cls, queryset, first=None, after=None):
+        """
+        Returns the connection holding the first `first` items of `queryset` after the `after` cursor.
+        """
+        if first is None or first <= 0:
+            first = settings.GRAPHQL_DEFAULT_LIST_SIZE
+        first = min(first, settings.GRAPHQL_MAX_LIST_SIZE)
+
+        field = cls.get_field()
+        descending = cls.ordering.startswith('-')
+        prefix = '-' if descending else ''
+        page = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+        if after:
+            value, pk = cls.decode_cursor(after, queryset.model)
+            page = page.filter(seek(field, value, pk, descending))
+
+        results = list(page[:first + 1])
+        edges = [cls.Edge(node=obj, cursor=encode_position(obj, field)) for obj in results[:first]]
+
+        connection = cls(
+            edges=edges,
+            page_info=graphene.relay.PageInfo(
+                has_next_page=len(results) > first,
+                has_previous_page=bool(after),
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+            ),
+        )
+        connection.queryset = queryset  # Counted by `totalCount`, if selected
+        return connection
+
+
+class PostConnection(KeysetConnection):
+    ordering = '-created_at'
+
+    class Meta:
+        node = PostType
+
+
+class TagConnection(KeysetConnection):
+    ordering = 'name'  # Served by the unique index on the name
+
+    class Meta:
+        node = TagType
@@ -0,0 +1,213 @@
+from django.contrib.auth import get_user_model
+from posts.models import Post, PostTag, Comment, Reaction, Tag
+
+import abc
+
+User = get_user_model()
+
+
+class BatchLoader(abc.ABC):
+    """
+    Request-scoped, synchronous DataLoader.
+
+    The GraphQL view executes synchronously, resolving list items one after the other,
+    so a loader can't wait for the sibling resolvers to ask for their keys. Instead, keys
+    are announced ahead with `prime_keys()` (e.g. the author IDs of all returned posts),
+    and the first `load()` fetches every announced key with a single query.
+    Results are cached until the end of the request.
+    """
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self.cache = {}
+        self.pending = set()
+
+    @abc.abstractmethod
+    def batch_load(self, keys):
+        """
+        Returns `{key: value}` for the given keys.
+        """
+
+    def get_default(self):
+        return None
+
+    def prime_keys(self, keys):
+        self.pending.update(key for key in keys if key is not None and key not in self.cache)
+
+    def load_related(self, obj, name, key):
+        """
+        Returns the relation `name` of `obj` if it was fetched along with it
+        (`select_related()`/`prefetch_related()`), otherwise loads `key`.
+        """
+        field = obj._meta.get_field(name)
+        if field.concrete and field.is_cached(obj):
+            return getattr(obj, name)
+        if name in getattr(obj, '_prefetched_objects_cache', {}):
+            return list(getattr(obj, name).all())
+
+        return self.load(key)
+
+    def load(self, key):
+        if key is None:
+            return self.get_default()
+
+        if key not in self.cache:
+            keys, self.pending = self.pending | {key}, set()
+            values = self.batch_load(keys)
+            for batch_key in keys:
+                self.cache[batch_key] = values.get(batch_key, self.get_default())
+
+            # Let the next level of fields batch over everything loaded now
+            self.loaders.prime(
+                obj for value in values.values() for obj in (value if isinstance(value, list) else [value])
+            )
+
+        return self.cache[key]
+
+
+class ObjectLoader(BatchLoader):
+    """
+    Loads objects of a model by primary key.
+    """
+    model = None
+
+    def batch_load(self, keys):
+        return self.model.objects.in_bulk(keys)
+
+
+class RelatedListLoader(BatchLoader):
+    """
+    Loads the lists of objects of a model pointing to the keys through a foreign key.
+    """
+    model = None
+    field = None
+
+    def get_default(self):
+        return []
+
+    def get_queryset(self, keys):
+        return self.model.objects.filter(**{f'{self.field}__in': keys}).order_by('id')
+
+    def batch_load(self, keys):
+        values = {}
+        for obj in self.get_queryset(keys):
+            values.setdefault(getattr(obj, f'{self.field}_id'), []).append(obj)
+        return values
+
+
+class UserLoader(ObjectLoader):
+    model = User
+
+
+class PostLoader(ObjectLoader):
+    model = Post
+
+
+class CommentLoader(ObjectLoader):
+    model = Comment
+
+
+class PostCommentsLoader(RelatedListLoader):
+    model = Comment
+    field = 'post'
+
+
+class CommentRepliesLoader(RelatedListLoader):
+    model = Comment
+    field = 'parent'
+
+
+class PostReactionsLoader(RelatedListLoader):
+    model = Reaction
+    field = 'post'
+
+
+class CommentReactionsLoader(RelatedListLoader):
+    model = Reaction
+    field = 'comment'
+
+
+class PostTagsLoader(BatchLoader):
+    """
+    Loads the tags of posts through the `Tag.posts` through table.
+    """
+
+    def get_default(self):
+        return []
+
+    def batch_load(self, keys):
+        values = {}
+        for post_tag in PostTag.objects.filter(post_id__in=keys).select_related('tag').order_by('tag_id'):
+            values.setdefault(post_tag.post_id, []).append(post_tag.tag)
+        return values
+
+
+class TagPostsLoader(BatchLoader):
+    """
+    Loads the posts of tags through the `Tag.posts` through table.
+    """
+
+    def get_default(self):
+        return []
+
+    def batch_load(self, keys):
+        values = {}
+        for post_tag in PostTag.objects.filter(tag_id__in=keys).select_related('post').order_by('post_id'):
+            values.setdefault(post_tag.tag_id, []).append(post_tag.post)
+        return values
+
+
+class Loaders:
+    """
+    The loaders of a GraphQL request, stored on the request (`info.context`).
+
+    `PRIMES` lists, per model, the loaders to announce keys to whenever objects of that
+    model are returned: e.g. once posts are loaded, their authors, tags, comments and
+    reactions are all fetched with one query per field, however many posts there are.
+    """
+    PRIMES = {
+        Post: [('users', 'author_id'), ('post_tags', 'id'), ('post_comments', 'id'), ('post_reactions', 'id')],
+        Comment: [
+            ('users', 'author_id'), ('posts', 'post_id'), ('comments', 'parent_id'),
+            ('comment_replies', 'id'), ('comment_reactions', 'id'),
+        ],
+        Reaction: [('users', 'user_id'), ('posts', 'post_id'), ('comments', 'comment_id')],
+        Tag: [('tag_posts', 'id')],
+    }
+
+    def __init__(self):
+        self.users = UserLoader(self)
+        self.posts = PostLoader(self)
+        self.comments = CommentLoader(self)
+        self.post_tags = PostTagsLoader(self)
+        self.post_comments = PostCommentsLoader(self)
+        self.post_reactions = PostReactionsLoader(self)
+        self.comment_replies = CommentRepliesLoader(self)
+        self.comment_reactions = CommentReactionsLoader(self)
+        self.tag_posts = TagPostsLoader(self)
+
+    @classmethod
+    def for_context(cls, info):
+        """
+        Returns the loaders of the current request, creating them on first use.
+        """
+        if not hasattr(info.context, 'loaders'):
+            info.context.loaders = cls()
+        return info.context.loaders
+
+    def prime(self, objects):
+        """
+        Announces the keys of the related fields of `objects` to the loaders.
+        """
+        objects = list(objects)
+        for model, primes in self.PRIMES.items():
+            instances = [obj for obj in objects if isinstance(obj, model)]
+            if not instances:
+                continue
+
+            deferred = instances[0].get_deferred_fields()  # Not selected, so not needed either
+            for loader_name, attname in primes:
+                if attname not in deferred:
+                    getattr(self, loader_name).prime_keys(getattr(obj, attname) for obj in instances)
+
+        return objects
@@ -0,0 +1,94 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode, SelectionSetNode
+
+
+def get_selected_fields(info, selection_set):
+    """
+    Yields the `(model field name, sub-selection set)` of the fields selected
+    in `selection_set`, expanding fragments.
+    """
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield to_snake_case(selection.name.value), selection.selection_set
+        elif isinstance(selection, FragmentSpreadNode):
+            yield from get_selected_fields(info, info.fragments[selection.name.value].selection_set)
+        elif isinstance(selection, InlineFragmentNode):
+            yield from get_selected_fields(info, selection.selection_set)
+
+
+def get_node_selection_set(info, selection_set=None):
+    """
+    Returns the selection set of the nodes of a Relay connection field (`edges { node { ... } }`),
+    merging every `node` selection.
+    """
+    if selection_set is None:
+        selection_set = info.field_nodes[0].selection_set
+
+    selections = []
+    for name, edges_selection_set in get_selected_fields(info, selection_set):
+        if name == 'edges' and edges_selection_set:
+            for edge_name, node_selection_set in get_selected_fields(info, edges_selection_set):
+                if edge_name == 'node' and node_selection_set:
+                    selections.extend(node_selection_set.selections)
+
+    return SelectionSetNode(selections=tuple(selections))
+
+
+def get_plan(model, info, selection_set, prefix=''):
+    """
+    Returns the `(only, select_related, prefetch_related)` lookups loading exactly
+    the fields of `model` selected in `selection_set`, prefixed with `prefix`.
+    """
+    only, select_related, prefetch_related = {f'{prefix}{model._meta.pk.name}'}, set(), []
+
+    for name, sub_selection_set in get_selected_fields(info, selection_set):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue  # Not a model field (e.g. `__typename`)
+
+        lookup = f'{prefix}{field.name}'
+
+        if not field.is_relation:
+            only.add(lookup)
+
+        elif field.many_to_one or (field.one_to_one and field.concrete):
+            # Join the related row, loading only its selected columns
+            only.add(lookup)
+            select_related.add(lookup)
+            if sub_selection_set:
+                nested = get_plan(field.related_model, info, sub_selection_set, prefix=f'{lookup}__')
+                only.update(nested[0])
+                select_related.update(nested[1])
+                prefetch_related.extend(nested[2])
+
+        elif sub_selection_set:
+            # Fetch the related rows of the whole page with one extra query
+            queryset = optimize_queryset(
+                field.related_model.objects.order_by('pk'),  # Same order as the loaders
+                info,
+                sub_selection_set,
+                only=[field.field.name] if field.one_to_many else []  # The key the rows are matched on
+            )
+            prefetch_related.append(Prefetch(lookup, queryset=queryset))
+
+    return only, select_related, prefetch_related
+
+
+def optimize_queryset(queryset, info, selection_set=None, only=()):
+    """
+    Applies `only()`, `select_related()` and `prefetch_related()` to `queryset`
+    to match the GraphQL selection set of the field being resolved (or `selection_set`),
+    so narrow queries load narrow rows and nested fields cost one query per level.
+    Fields in `only` are always loaded.
+    """
+    if selection_set is None:
+        selection_set = info.field_nodes[0].selection_set
+
+    fields, select_related, prefetch_related = get_plan(queryset.model, info, selection_set)
+    queryset = queryset.only(*fields, *only).prefetch_related(*prefetch_related)
+    if select_related:  # `select_related()` without lookups would join every foreign key
+        queryset = queryset.select_related(*select_related)
+    return queryset
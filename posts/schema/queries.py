@@ -1,5 +1,8 @@
 from posts.models import Post, Tag, StatusChoices
-from .types import PostType, TagType
+from .connections import PostConnection, TagConnection
+from .loaders import Loaders
+from .optimizer import get_node_selection_set, optimize_queryset
+from .types import PostType
 
 import graphene
 
@@ -9,15 +12,21 @@ class Query(graphene.ObjectType):
     Root query class for retrieving posts and tags.
 
     Fields:
-        posts: A list of published posts, optionally filtered by author ID.
+        posts: A connection of published posts, newest first, optionally filtered by author ID.
         post: A single post by ID.
-        tags: A list of all tags.
+        tags: A connection of all tags, by name.
+
+    Connections are paginated with `first`/`after` keyset cursors (see `KeysetConnection`).
+
+    Querysets only load the columns and relations selected in the query
+    (see `optimize_queryset`); returned objects are also announced to the request's
+    loaders, so related fields fetched otherwise are batch-loaded with one query per field.
     """
-    posts = graphene.List(PostType, author_id=graphene.Int())
+    posts = graphene.Field(PostConnection, author_id=graphene.Int(), first=graphene.Int(), after=graphene.String())
     post = graphene.Field(PostType, id=graphene.Int(required=True))
-    tags = graphene.List(TagType)
+    tags = graphene.Field(TagConnection, first=graphene.Int(), after=graphene.String())
 
-    def resolve_posts(self, info, author_id=None):
+    def resolve_posts(self, info, author_id=None, first=None, after=None):
         """
         Resolves the list of posts, optionally filtered by the author ID.
         """
@@ -30,13 +39,26 @@ class Query(graphene.ObjectType):
                 author_id=author_id  # Filter by author if provided
             )
 
-        return queryset
+        connection = PostConnection.paginate(
+            optimize_queryset(queryset, info, get_node_selection_set(info), only=[PostConnection.get_field()]), first, after
+        )
+        Loaders.for_context(info).prime(edge.node for edge in connection.edges)
+        return connection
 
     def resolve_post(self, info, id):
         try:
-            return Post.objects.get(id=id)
+            post = optimize_queryset(Post.objects.all(), info).get(id=id)
         except Post.DoesNotExist:
             return None
 
-    def resolve_tags(self, info):
-        return Tag.objects.all()
+        Loaders.for_context(info).prime([post])
+        return post
+
+    def resolve_tags(self, info, first=None, after=None):
+        connection = TagConnection.paginate(
+            optimize_queryset(Tag.objects.all(), info, get_node_selection_set(info), only=[TagConnection.get_field()]),
+            first,
+            after,
+        )
+        Loaders.for_context(info).prime(edge.node for edge in connection.edges)
+        return connection
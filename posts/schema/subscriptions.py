@@ -0,0 +1,44 @@
+from posts.events import PostEvents
+from posts.models import Post, Comment, StatusChoices
+from .types import PostType, CommentType
+
+import graphene
+
+
+class Subscription(graphene.ObjectType):
+    """
+    Root subscription class, served over WebSocket by `GraphQLSubscriptionConsumer`.
+
+    Fields:
+        post_updated: The post, every time it, its comments or its reactions change.
+        comment_added: Every comment published on the post.
+
+    Each field listens to a channel-layer group (see `PostEvents`), and is resolved
+    with the object loaded for every event of the group (see `get_event_root`).
+    """
+    post_updated = graphene.Field(PostType, id=graphene.Int(required=True))
+    comment_added = graphene.Field(CommentType, post_id=graphene.Int(required=True))
+
+    def resolve_post_updated(root, info, id):
+        return root
+
+    def resolve_comment_added(root, info, post_id):
+        return root
+
+    @staticmethod
+    def get_group(field_name, arguments):
+        """
+        Returns the group of the events of a subscription field, given its arguments.
+        """
+        if field_name == 'post_updated':
+            return PostEvents.post_group(arguments['id'])
+        return PostEvents.comments_group(arguments['post_id'])
+
+    @staticmethod
+    def get_event_root(field_name, event):
+        """
+        Returns the object a subscription field resolves to for a group event (None once unpublished).
+        """
+        if field_name == 'post_updated':
+            return Post.objects.filter(id=event['post_id'], status=StatusChoices.PUBLISHED).first()
+        return Comment.objects.filter(id=event['comment_id'], status=StatusChoices.PUBLISHED).first()
@@ -1,6 +1,7 @@
 from graphene_django import DjangoObjectType
 from posts.models import Post, Comment, Reaction, Tag, StatusChoices, ReactionChoices
 from django.contrib.auth import get_user_model
+from .loaders import Loaders
 
 import graphene
 
@@ -14,14 +15,28 @@ class UserType(DjangoObjectType):
 
 
 class PostType(DjangoObjectType):
+    """
+    Related fields use the rows fetched along with the post (see `posts.schema.optimizer`),
+    or else the request's loaders (see `posts.schema.loaders`), so each of them costs
+    one query per request, not one per post.
+    """
     class Meta:
         model = Post
-        fields = "__all__"
+        exclude = ("search_vector", )  # Internal full-text search column
 
     author = graphene.Field(lambda: UserType)  # Foreignkey field
 
     def resolve_author(self, info):
-        return self.author
+        return Loaders.for_context(info).users.load_related(self, 'author', self.author_id)
+
+    def resolve_tags(self, info):
+        return Loaders.for_context(info).post_tags.load_related(self, 'tags', self.id)
+
+    def resolve_comments(self, info):
+        return Loaders.for_context(info).post_comments.load_related(self, 'comments', self.id)
+
+    def resolve_reactions(self, info):
+        return Loaders.for_context(info).post_reactions.load_related(self, 'reactions', self.id)
 
 
 class TagType(DjangoObjectType):
@@ -29,14 +44,41 @@ class TagType(DjangoObjectType):
         model = Tag
         fields = "__all__"
 
+    def resolve_posts(self, info):
+        return Loaders.for_context(info).tag_posts.load_related(self, 'posts', self.id)
+
 
 class CommentType(DjangoObjectType):
     class Meta:
         model = Comment
         fields = "__all__"
 
+    def resolve_author(self, info):
+        return Loaders.for_context(info).users.load_related(self, 'author', self.author_id)
+
+    def resolve_post(self, info):
+        return Loaders.for_context(info).posts.load_related(self, 'post', self.post_id)
+
+    def resolve_parent(self, info):
+        return Loaders.for_context(info).comments.load_related(self, 'parent', self.parent_id)
+
+    def resolve_replies(self, info):
+        return Loaders.for_context(info).comment_replies.load_related(self, 'replies', self.id)
+
+    def resolve_reactions(self, info):
+        return Loaders.for_context(info).comment_reactions.load_related(self, 'reactions', self.id)
+
 
 class ReactionType(DjangoObjectType):
     class Meta:
         model = Reaction
         fields = "__all__"
+
+    def resolve_user(self, info):
+        return Loaders.for_context(info).users.load_related(self, 'user', self.user_id)
+
+    def resolve_post(self, info):
+        return Loaders.for_context(info).posts.load_related(self, 'post', self.post_id)
+
+    def resolve_comment(self, info):
+        return Loaders.for_context(info).comments.load_related(self, 'comment', self.comment_id)
@@ -1,34 +1,66 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import StatusChoices, Post, Comment, Reaction, Tag, ReactionChoices
+from .models import Post, Comment, Reaction, Tag, ReactionChoices
+from .comment_tree import build_comment_tree
+from .reaction_buffer import ReactionBuffer
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class MyReactionMixin(serializers.Serializer):
+    """
+    Adds the `my_reaction` field: the reaction of the current user (`like`, `dislike` or None).
+
+    Reactions are never queried per object; the view loads them for the whole page
+    (see `Reaction.get_user_reactions`) and passes them as the `my_reactions` context.
+    """
+    my_reaction = serializers.SerializerMethodField()
+
+    def get_my_reaction(self, obj):
+        target = ReactionBuffer.target(**{f'{obj._meta.model_name}_id': obj.id})
+        return self.context.get('my_reactions', {}).get(target)
+
+
+class CommentSerializer(MyReactionMixin, serializers.ModelSerializer):
     """
     Serializer for comments, including replies and reaction counts (likes/dislikes).
-    Handles nested replies and ensures only published comments are retrieved.
+    Reaction and reply counts are read from the denormalized counter columns.
+
+    Replies are only nested in post details, down to `COMMENT_TREE_MAX_DEPTH` levels;
+    otherwise `replies` is empty and clients load them from `/api/comments/{id}/replies/`.
     """
     author = serializers.ReadOnlyField(source='author.username')
     replies = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    dislikes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ['id', 'parent', 'post', 'author', 'content', 'replies', 'likes_count', 'dislikes_count', 'created_at']
-        read_only_fields = ['post', 'author', 'status', 'replies', 'created_at']
+        fields = [
+            'id', 'parent', 'post', 'author', 'content', 'replies', 'reply_count',
+            'likes_count', 'dislikes_count', 'my_reaction', 'created_at'
+        ]
+        read_only_fields = [
+            'post', 'author', 'status', 'replies', 'reply_count', 'likes_count', 'dislikes_count', 'created_at'
+        ]
 
-    def get_replies(self, obj):
-        if obj.replies:
-            # Retrieve the replies queryset directly from the related name
-            replies = obj.replies.filter(status=StatusChoices.PUBLISHED)
-            return CommentSerializer(replies, many=True, context=self.context).data
-        return []
+    def validate_parent(self, parent):
+        """
+        Validates that a moved comment stays on its post and out of its own replies,
+        which would corrupt the materialized paths of the thread.
+        """
+        comment = self.instance
+        if parent is None or comment is None:
+            return parent
 
-    def get_likes_count(self, obj):
-        return obj.reactions.filter(comment=obj, reaction_type='like').count()
+        if parent.post_id != comment.post_id:
+            raise serializers.ValidationError("The parent comment must belong to the same post.")
+        if parent.id == comment.id or (comment.path and parent.path.startswith(comment.path)):
+            raise serializers.ValidationError("A comment cannot reply to itself or to its own replies.")
+        return parent
 
-    def get_dislikes_count(self, obj):
-        return obj.reactions.filter(comment=obj, reaction_type='dislike').count()
+    def get_replies(self, obj):
+        # Use the replies linked in memory by `build_comment_tree` when available
+        if hasattr(obj, 'tree_replies'):
+            return CommentSerializer(obj.tree_replies, many=True, context=self.context).data
+
+        return []  # Loaded on demand, page by page
 
 
 class ReactionSerializer(serializers.ModelSerializer):
@@ -71,6 +103,48 @@ class ReactionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ReactionUserSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the users who reacted to a post or comment.
+    """
+    username = serializers.ReadOnlyField(source='user.username')
+    user = serializers.HyperlinkedRelatedField(
+        view_name='user-detail',
+        lookup_field='username',
+        read_only=True
+    )
+
+    class Meta:
+        model = Reaction
+        fields = ['id', 'user', 'username', 'reaction_type', 'created_at']
+
+
+class TagNameField(serializers.SlugRelatedField):
+    """
+    Tag field that represents tags by name and accepts any valid name as input,
+    whether the tag exists or not.
+
+    Names are not looked up one by one; they are resolved (and missing tags created)
+    in bulk when the post is saved.
+    """
+    default_error_messages = {
+        'invalid_name': 'Tag name must be 1 to {max_length} characters long.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'name')
+        kwargs.setdefault('queryset', Tag.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        name = str(data).strip().lstrip('#')
+        max_length = Tag._meta.get_field('name').max_length
+
+        if not name or len(name) > max_length:
+            self.fail('invalid_name', max_length=max_length)
+        return name
+
+
 class TagSerializer(serializers.ModelSerializer):
     """
     Serializer for tags associated with posts.
@@ -82,32 +156,77 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'posts']
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(MyReactionMixin, serializers.ModelSerializer):
     """
     Serializer for listing posts with details about the author, tags, and creation timestamps.
     It also validates that a post can have no more than 5 tags.
+
+    Hashtags in the caption (e.g. `#travel`) are added to the post tags automatically
+    while there is room left, in order of appearance (the others are skipped),
+    and tags that don't exist yet are created.
     """
+    max_tags = 5
+
     author_username = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     author = serializers.HyperlinkedRelatedField(
         view_name='user-detail',
         lookup_field='username',
         read_only=True
     )
-    tags = serializers.SlugRelatedField(
+    tags = TagNameField(
         many=True,
-        queryset=Tag.objects.all(),
-        slug_field='name',  # Retrieve tag name instead of the ID
         required=False
     )
 
     class Meta:
         model = Post
-        fields = ['id', 'image', 'caption', 'author', 'author_username', 'tags', 'created_at', 'updated_at']
+        fields = [
+            'id', 'image', 'image_variants', 'caption', 'author', 'author_username', 'tags',
+            'my_reaction', 'created_at', 'updated_at'
+        ]
         read_only_fields = ['status']
 
     def get_author_username(self, obj):
         return obj.author.username
 
+    def get_image_variants(self, obj):
+        """
+        Returns the URLs of the resized image variants, grouped by size and format:
+        `{"thumbnail": {"webp": "...", "jpeg": "..."}, "feed": {...}, "full": {...}}`.
+
+        Empty until the variants are generated in the background.
+        """
+        request = self.context.get('request')
+        variants = {}
+
+        for variant in obj.image_variants.all():
+            url = variant.image.url
+            if request:
+                url = request.build_absolute_uri(url)
+            variants.setdefault(variant.kind, {})[variant.image_format] = url
+
+        return variants
+
+    def get_tag_names(self, tags_data, caption):
+        """
+        Returns the tag names of the post: the given tags, which must be no more than `max_tags`,
+        plus the caption hashtags fitting within `max_tags`.
+        """
+        tag_names = set(tags_data)
+
+        if len(tag_names) > self.max_tags:
+            raise serializers.ValidationError({
+                'tags': f'Too many tags. it must be less or equal {self.max_tags} tags.'
+            })
+
+        for name in Post.extract_hashtags(caption):
+            if len(tag_names) >= self.max_tags:
+                break
+            tag_names.add(name)
+
+        return tag_names
+
     def create(self, validated_data):
         """
         Creates a new post and associates it with tags.
@@ -115,32 +234,54 @@ class PostListSerializer(serializers.ModelSerializer):
         This method also validates that no more than 5 tags are associated
         with the post.
         """
-        tags_data = validated_data.pop('tags', [])
-
-        if len(tags_data) > 5:
-            raise serializers.ValidationError({
-                'tags': 'Too many tags. it must be less or equal 5 tags.'
-            })
+        tag_names = self.get_tag_names(
+            validated_data.pop('tags', []),
+            validated_data.get('caption')
+        )
 
-        # Create new post
-        new_post = Post.objects.create(**validated_data)
+        with transaction.atomic():  # Never leave a post without its tags
+            # Create new post
+            new_post = Post.objects.create(**validated_data)
 
-        # Set tags on post
-        for tag_name in tags_data:
-            tag = Tag.objects.get(name=tag_name)
-            new_post.tags.add(tag)
+            # Set tags on post (resolved and linked in bulk)
+            new_post.set_tags(tag_names, clear=False)
 
         return new_post
 
+    def update(self, instance, validated_data):
+        """
+        Updates a post and its tags.
+
+        Given tags replace the current ones; if only the caption changes,
+        its new hashtags are added to the current tags.
+        """
+        tags_data = validated_data.pop('tags', None)
+
+        if tags_data is not None or 'caption' in validated_data:
+            if tags_data is None:
+                tags_data = instance.tags.values_list('name', flat=True)
 
-class PostDetailSerializer(serializers.ModelSerializer):
+            tag_names = self.get_tag_names(
+                tags_data,
+                validated_data.get('caption', instance.caption)
+            )
+            with transaction.atomic():
+                instance = super().update(instance, validated_data)
+                instance.set_tags(tag_names)
+            return instance
+
+        return super().update(instance, validated_data)
+
+
+class PostDetailSerializer(MyReactionMixin, serializers.ModelSerializer):
     """
     Serializer for detailed post view, including comments, tags, and reaction counts.
+
+    Comments are returned as a tree: only top-level comments are listed and replies
+    are nested under their parents.
     """
     author_username = serializers.SerializerMethodField()
     comments = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    dislikes_count = serializers.SerializerMethodField()
     author = serializers.HyperlinkedRelatedField(
         view_name='user-detail',
         lookup_field='username',
@@ -156,21 +297,13 @@ class PostDetailSerializer(serializers.ModelSerializer):
         model = Post
         fields = [
             'id', 'image', 'caption', 'author', 'author_username', 'tags',
-            'comments', 'likes_count', 'dislikes_count', 'created_at', 'updated_at'
+            'comments', 'likes_count', 'dislikes_count', 'my_reaction', 'created_at', 'updated_at'
         ]
+        read_only_fields = ['likes_count', 'dislikes_count']
 
     def get_author_username(self, obj):
         return obj.author.username
 
     def get_comments(self, obj):
-        # Filter published comments
-        published_comments = obj.comments.filter(
-            status=StatusChoices.PUBLISHED
-        )
-        return CommentSerializer(published_comments, many=True).data
-
-    def get_likes_count(self, obj):
-        return obj.reactions.filter(post=obj, reaction_type='like').count()
-
-    def get_dislikes_count(self, obj):
-        return obj.reactions.filter(post=obj, reaction_type='dislike').count()
+        # Load every published comment at once and nest the replies in memory
+        return CommentSerializer(build_comment_tree(obj), many=True, context=self.context).data
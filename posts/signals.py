@@ -0,0 +1,243 @@
+from django.apps import apps as global_apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_migrate, pre_save
+from django.dispatch import receiver
+from .cache import PostDetailCache
+from .events import PostEvents
+from .models import Post, PostImageVariant, Comment, Reaction, Tag, PostTag, ImageBlob, StatusChoices
+from .schema.cache import GraphQLResponseCache
+
+User = get_user_model()
+
+
+@receiver(pre_migrate)
+def create_trigram_extension(sender, using, **kwargs):
+    """
+    Signal to enable `pg_trgm` before migrations run, so the trigram
+    indexes on usernames and tag names can be created.
+    """
+    connection = connections[using]
+    if sender.name != 'posts' or connection.vendor != 'postgresql':
+        return  # Run once per migrate, and only on PostgreSQL
+
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+@receiver(post_migrate)
+def fill_comment_paths(sender, apps=global_apps, **kwargs):
+    """
+    Signal to fill the materialized paths of comments saved before the `path` column existed,
+    once migrations ran, so subtree lookups never see an empty path.
+    """
+    if sender.name != 'posts':
+        return
+
+    try:
+        apps.get_model('posts', 'Comment')._meta.get_field('path')
+    except (LookupError, FieldDoesNotExist):
+        return  # Migrated to a state without paths
+
+    post_ids = Comment.objects.filter(path='').values_list('post_id', flat=True).distinct()
+    for post_id in post_ids.order_by('post_id').iterator():
+        Comment.rebuild_paths(post_id)
+
+
+@receiver(post_save, sender=Post)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal to refresh the full-text search vector of a post when its caption is saved.
+    """
+    if update_fields and 'caption' not in update_fields:
+        return
+
+    Post.objects.filter(pk=instance.pk).update(
+        search_vector=Post.build_search_vector()
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_image(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal to remember the image a post had before saving, to release it if it changes.
+    """
+    instance._previous_image = None
+    if instance.pk and (not update_fields or 'image' in update_fields):
+        instance._previous_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def update_image_references(sender, instance, created, **kwargs):
+    """
+    Signal to keep the reference counts of the shared image files up to date.
+    """
+    previous_image = getattr(instance, '_previous_image', None)
+    current_image = instance.image.name
+
+    if not created and previous_image is None:
+        return  # Image unchanged (not part of `update_fields`)
+
+    if current_image == previous_image:
+        return
+
+    if current_image:
+        ImageBlob.acquire(current_image)
+    if previous_image:
+        ImageBlob.release(previous_image, instance.image.storage)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    """
+    Signal to release the image of a deleted post.
+    """
+    if instance.image.name:
+        ImageBlob.release(instance.image.name, instance.image.storage)
+
+
+@receiver(post_delete, sender=PostImageVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    """
+    Signal to delete the file of a deleted image variant (e.g. along with its post),
+    once the deletion is committed. Unlike post images, variant files are never shared.
+    """
+    name, storage = instance.image.name, instance.image.storage
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=PostTag)
+@receiver([post_save, post_delete], sender=PostImageVariant)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """
+    Signal to invalidate the cached details of the post a post, comment, tag link or image variant
+    belongs to (and the post lists, unless a comment changed), and notify its `postUpdated` subscribers.
+    """
+    post_id = instance.pk if sender is Post else instance.post_id
+    PostDetailCache.invalidate(post_id, lists=sender is not Comment)
+    PostEvents.post_updated(post_id)
+
+
+@receiver([post_save, post_delete], sender=Reaction)
+def invalidate_reacted_post_cache(sender, instance, **kwargs):
+    """
+    Signal to invalidate the cached details of a reacted post (or the post of a reacted comment),
+    and notify its `postUpdated` subscribers of the new counts.
+    The post lists only change for the reacting user (`my_reaction`).
+    """
+    post_id = instance.post_id
+    if post_id is None:
+        post_id = Comment.objects.filter(pk=instance.comment_id).values_list('post_id', flat=True).first()
+    else:
+        PostDetailCache.invalidate_user_lists(instance.user_id)
+
+    if post_id is not None:
+        PostDetailCache.invalidate(post_id)
+        PostEvents.post_updated(post_id)
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tagged_posts_cache(sender, instance, created, **kwargs):
+    """
+    Signal to invalidate the cached details of the posts of a renamed tag, and notify their subscribers.
+    """
+    if created:
+        return
+
+    post_ids = list(PostTag.objects.filter(tag=instance).values_list('post_id', flat=True))
+    PostDetailCache.invalidate(*post_ids, lists=True)
+    for post_id in post_ids:
+        PostEvents.post_updated(post_id)
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_username(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal to remember the username a user had before saving, to notice when it changes.
+    """
+    instance._previous_username = None
+    if instance.pk and (not update_fields or 'username' in update_fields):
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_posts_cache(sender, instance, created, **kwargs):
+    """
+    Signal to invalidate the cached details of the posts of a renamed user, and the post lists,
+    which show the author's username.
+    """
+    previous_username = getattr(instance, '_previous_username', None)
+    if created or previous_username is None or previous_username == instance.username:
+        return
+
+    post_ids = list(instance.posts.values_list('id', flat=True))
+    PostDetailCache.invalidate(*post_ids, lists=True)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Reaction)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=PostTag)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_graphql_responses(sender, instance, **kwargs):
+    """
+    Signal to invalidate the cached GraphQL responses selecting the written model,
+    or the models whose fields change with it (tags of posts).
+
+    Reactions only invalidate the responses selecting reactions: the reaction counters of
+    posts and comments change too often, and are served up to their `GRAPHQL_CACHE_HINTS`
+    max-age late instead of missing every post and comment response on each reaction.
+    """
+    models = {
+        PostTag: [Post, Tag],
+    }
+    GraphQLResponseCache.invalidate(*models.get(sender, [sender]))
+
+
+@receiver(pre_save, sender=Comment)
+def remember_previous_parent(sender, instance, **kwargs):
+    """
+    Signal to remember the parent a comment had before saving, to recount its replies if it changes,
+    and its status, to notice when it gets published.
+    """
+    instance._previous_parent_id = instance._previous_status = None
+    if instance.pk:
+        instance._previous_parent_id, instance._previous_status = Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('parent_id', 'status').first() or (None, None)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_added(sender, instance, **kwargs):
+    """
+    Signal to notify the `commentAdded` subscribers of the post when a comment is published.
+    """
+    previous_status = getattr(instance, '_previous_status', None)
+    if instance.status == StatusChoices.PUBLISHED and previous_status != StatusChoices.PUBLISHED:
+        PostEvents.comment_added(instance)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def update_reply_counts(sender, instance, **kwargs):
+    """
+    Signal to recount the published replies of the parent comment when a reply is saved or deleted.
+    """
+    Comment.update_reply_counts(instance.parent_id, getattr(instance, '_previous_parent_id', None))
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_path(sender, instance, created, **kwargs):
+    """
+    Signal to fill the materialized path of a new comment, or move it with its replies if its parent changed.
+    """
+    if created or instance.parent_id != getattr(instance, '_previous_parent_id', instance.parent_id):
+        instance.set_path()
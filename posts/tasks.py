@@ -1,22 +1,147 @@
 from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
 from django.shortcuts import get_object_or_404
+from itertools import islice
+from io import BytesIO
+from PIL import Image, ImageOps
+
+from .reaction_buffer import ReactionBuffer
+from .timeline import TimelineManager
 
 
 @shared_task
 def notify_followers(post_id):
+    """
+    Notifies the followers of the post author and fans the post out to their timelines.
+
+    Followers are streamed as IDs (never as user objects) and handed over to
+    `fan_out_post` subtasks in chunks of `TIMELINE_FANOUT_CHUNK_SIZE`.
+    Posts of authors with at least `TIMELINE_CELEBRITY_THRESHOLD` followers are not
+    pushed to timelines; they are merged into the feeds at read time instead.
+    """
     from accounts.models import Notification
     from posts.models import Post
 
     post_obj = get_object_or_404(Post, id=post_id)
     author = post_obj.author
 
-    # Get author followers
-    followers = author.followers.all()
-    followers = [f.follower for f in followers]  # CustomUser Objects
+    # Get author followers IDs
+    follower_ids = author.followers.values_list('follower_id', flat=True)
+    is_celebrity = follower_ids.count() >= settings.TIMELINE_CELEBRITY_THRESHOLD
+
+    if is_celebrity:
+        TimelineManager.push_author_post(author.id, post_obj.id)
+    else:
+        TimelineManager.push_post([author.id], post_obj.id)  # Authors see their own posts
 
     notification = Notification.objects.create(
         message=f'"{author.username}" Has Shared New Post!'
     )
 
-    # Add followers to target users
-    notification.target_users.add(*followers)
+    chunk_size = settings.TIMELINE_FANOUT_CHUNK_SIZE
+    follower_ids = follower_ids.iterator(chunk_size=chunk_size)
+
+    # Split the fan-out into chunked subtasks
+    while chunk := list(islice(follower_ids, chunk_size)):
+        fan_out_post.delay(post_obj.id, notification.id, chunk, push_to_timelines=not is_celebrity)
+
+
+@shared_task
+def fan_out_post(post_id, notification_id, follower_ids, push_to_timelines=True):
+    """
+    Adds a chunk of followers to the new post notification,
+    and pushes the post into their timelines.
+    """
+    from accounts.models import Notification
+
+    # Add followers to target users with a single insert
+    through = Notification.target_users.through
+    through.objects.bulk_create(
+        [through(notification_id=notification_id, user_id=user_id) for user_id in follower_ids],
+        ignore_conflicts=True
+    )
+
+    if push_to_timelines:
+        TimelineManager.push_post(follower_ids, post_id)
+
+
+@shared_task
+def generate_image_variants(post_id):
+    """
+    Generates the resized WebP/JPEG variants of a post image.
+
+    The image is rotated according to its EXIF orientation and re-encoded from its
+    pixels only, so EXIF data (camera, GPS location, ...) is stripped from the variants.
+    Sizes are configured by `POST_IMAGE_VARIANTS`; images are never upscaled.
+    """
+    from posts.models import Post, PostImageVariant, ImageFormatChoices
+
+    post_obj = Post.objects.filter(id=post_id).first()
+    if not post_obj or not post_obj.image:
+        return
+
+    with post_obj.image.open('rb') as image_file:
+        source = ImageOps.exif_transpose(Image.open(image_file))
+        source.load()
+
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+
+    existing = {
+        (variant.kind, variant.image_format): variant
+        for variant in post_obj.image_variants.all()
+    }
+
+    for kind, size in settings.POST_IMAGE_VARIANTS.items():
+        resized = source.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        for image_format in ImageFormatChoices.values:
+            # JPEG has no alpha channel
+            encoded = resized.convert('RGB') if image_format == ImageFormatChoices.JPEG else resized
+            buffer = BytesIO()
+            encoded.save(buffer, format=image_format.upper(), quality=settings.POST_IMAGE_QUALITY, optimize=True)
+
+            variant = existing.get((kind, image_format)) or PostImageVariant(
+                post=post_obj,
+                kind=kind,
+                image_format=image_format
+            )
+            variant.width, variant.height = encoded.size
+
+            if variant.image:
+                variant.image.delete(save=False)  # Replace the variant of a previous image
+
+            variant.image.save(
+                f'{post_obj.id}_{kind}.{image_format}',
+                ContentFile(buffer.getvalue()),
+                save=False
+            )
+            variant.save()
+
+
+@shared_task
+def flush_reaction_buffer():
+    """
+    Saves the reaction toggles buffered in Redis (see `ReactionBuffer`) to the database.
+
+    Scheduled by celery beat every `REACTION_FLUSH_INTERVAL` seconds; each run handles up to
+    `REACTION_FLUSH_BATCH_SIZE` posts/comments, the rest are left for the next run.
+    """
+    from posts.models import Reaction
+
+    changed = 0
+    targets = ReactionBuffer.pop_dirty_targets(settings.REACTION_FLUSH_BATCH_SIZE)
+
+    for index, target in enumerate(targets):
+        try:
+            states = ReactionBuffer.begin_flush(target)
+            if states:
+                changed += Reaction.apply_buffered(states, **ReactionBuffer.target_ids(target))
+            ReactionBuffer.end_flush(target)
+        except Exception:
+            ReactionBuffer.mark_dirty(*targets[index:])  # Retry the unsaved targets on the next run
+            raise
+
+    return changed
@@ -1,3 +1,1254 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.apps import apps
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
 
-# Create your tests here.
+from .comment_tree import build_comment_tree
+from social_media_project.asgi import application
+from social_media_project.graphql_persisted import PersistedQueries, documents
+from .schema.loaders import BatchLoader, Loaders
+from .signals import fill_comment_paths
+from .reaction_buffer import ReactionBuffer
+from .tasks import notify_followers, fan_out_post, generate_image_variants, flush_reaction_buffer
+from .timeline import TimelineManager
+from .serializers import PostListSerializer
+from .views import CommentDetailView, PostViewSet
+from .models import StatusChoices, ReactionChoices, ImageBlob, Post, PostImageVariant, Comment, Reaction, Tag
+
+from PIL import Image
+
+from io import BytesIO, StringIO
+from urllib.parse import parse_qs, urlparse
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+User = get_user_model()
+
+
+class PostTestCase(APITestCase):
+    """
+    Base test case providing a user, a published post and helpers to create content.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(mobile='09120000001', password='password', username='author')
+        self.post = self.create_post()
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, number, **kwargs):
+        return User.objects.create_user(mobile=f'0912{number:07d}', password='password', **kwargs)
+
+    def create_post(self, author=None, caption='A post', **kwargs):
+        kwargs.setdefault('status', StatusChoices.PUBLISHED)
+        return Post.objects.create(author=author or self.user, caption=caption, image='posts/image.jpg', **kwargs)
+
+    def create_comment(self, parent=None, post=None, **kwargs):
+        kwargs.setdefault('status', StatusChoices.PUBLISHED)
+        return Comment.objects.create(
+            post=post or self.post, parent=parent, author=self.user, content='A comment', **kwargs
+        )
+
+
+class ReactionCounterTests(PostTestCase):
+    def react(self, reaction, post=None, comment=None):
+        return self.client.post(
+            '/api/reaction/', {'reaction': reaction, 'post': post, 'comment': comment}, format='json'
+        )
+
+    def test_toggles_update_post_counters(self):
+        response = self.react(ReactionChoices.LIKE, post=self.post.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (1, 0))
+
+        self.react(ReactionChoices.DISLIKE, post=self.post.id)  # Flip
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (0, 1))
+
+        self.react(ReactionChoices.DISLIKE, post=self.post.id)  # Remove
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (0, 0))
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_toggles_update_comment_counters_only(self):
+        comment = self.create_comment()
+        self.react(ReactionChoices.LIKE, comment=comment.id)
+
+        comment.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(comment.likes_count, 1)
+        self.assertEqual(self.post.likes_count, 0)
+
+    def write_while_loading(self, view_class, write):
+        """
+        Patches `view_class.get_object` to call `write()` between loading the object and saving it.
+        """
+        get_object = view_class.get_object
+
+        def get_object_and_write(view):
+            obj = get_object(view)
+            write()
+            return obj
+
+        return mock.patch.object(view_class, 'get_object', autospec=True, side_effect=get_object_and_write)
+
+    def test_post_edits_keep_concurrent_reactions(self):
+        def react():
+            Reaction.update_counters(post_id=self.post.id, likes_count=1)
+
+        with self.write_while_loading(PostViewSet, react):
+            response = self.client.patch(f'/api/posts/{self.post.id}/', {'caption': 'Edited'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.caption, self.post.likes_count), ('Edited', 1))
+
+    def test_comment_edits_keep_concurrent_reactions_and_replies(self):
+        comment = self.create_comment()
+        path = comment.path
+
+        def react_and_reply():
+            Reaction.update_counters(comment_id=comment.id, likes_count=1)
+            self.create_comment(parent=comment)
+
+        with self.write_while_loading(CommentDetailView, react_and_reply):
+            response = self.client.patch(f'/api/comments/{comment.id}/', {'content': 'Edited'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        comment.refresh_from_db()
+        self.assertEqual((comment.content, comment.likes_count, comment.reply_count), ('Edited', 1, 1))
+        self.assertEqual(comment.path, path)
+
+    def test_reconcile_counters_fixes_drift(self):
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+        Post.objects.filter(id=self.post.id).update(likes_count=5, dislikes_count=2)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (1, 0))
+
+
+class CommentTreeTests(PostTestCase):
+    def test_links_published_comments_in_one_query(self):
+        first = self.create_comment()
+        reply = self.create_comment(parent=first)
+        nested_reply = self.create_comment(parent=reply)
+        second = self.create_comment()
+
+        with self.assertNumQueries(1):
+            roots = build_comment_tree(self.post, max_depth=3)
+
+        self.assertEqual(roots, [first, second])
+        self.assertEqual(roots[0].tree_replies, [reply])
+        self.assertEqual(roots[0].tree_replies[0].tree_replies, [nested_reply])
+
+    def test_drops_replies_of_unpublished_comments(self):
+        draft = self.create_comment(status=StatusChoices.DRAFT)
+        self.create_comment(parent=draft)
+
+        self.assertEqual(build_comment_tree(self.post), [])
+
+    def test_stops_at_max_depth(self):
+        comment = self.create_comment()
+        reply = self.create_comment(parent=comment)
+        self.create_comment(parent=reply)
+
+        roots = build_comment_tree(self.post, max_depth=2)
+
+        self.assertEqual(roots[0].tree_replies, [reply])
+        self.assertEqual(roots[0].tree_replies[0].tree_replies, [])
+
+
+class PostListPaginationTests(PostTestCase):
+    def test_pages_published_posts_newest_first(self):
+        posts = [self.post, *(self.create_post(caption=f'Post {number}') for number in range(4))]
+        self.create_post(status=StatusChoices.DRAFT)
+
+        response = self.client.get('/api/posts/', {'page_size': 3})
+        self.assertEqual([post['id'] for post in response.data['results']], [post.id for post in posts[:-4:-1]])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in response.data['results']], [posts[1].id, posts[0].id])
+        self.assertIsNone(response.data['next'])
+
+    def test_rejects_invalid_cursors(self):
+        response = self.client.get('/api/posts/', {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TimelineTestCase(PostTestCase):
+    """
+    Base test case for the Redis timelines; a follower of the author reads the feed.
+    """
+    def setUp(self):
+        super().setUp()
+        self.follower = self.create_user(2)
+        self.follower.followings.create(following=self.user)
+        self.client.force_authenticate(self.follower)
+        self.addCleanup(self.clear_timelines)
+
+        # Run the fan-out subtasks inline
+        patcher = mock.patch.object(fan_out_post, 'delay', side_effect=fan_out_post)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def clear_timelines(self):
+        connection = TimelineManager.get_connection()
+        keys = list(connection.scan_iter('timeline:*'))
+        if keys:
+            connection.delete(*keys)
+
+    def get_feed_ids(self, **params):
+        response = self.client.get('/api/feed/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']], response.data['next']
+
+
+class TimelineTests(TimelineTestCase):
+    def test_feed_lists_fanned_out_posts_newest_first(self):
+        posts = [self.post, self.create_post(), self.create_post()]
+        for post in posts:
+            notify_followers(post.id)
+
+        post_ids, next_link = self.get_feed_ids(page_size=2)
+        self.assertEqual(post_ids, [posts[2].id, posts[1].id])
+
+        post_ids, next_link = self.get_feed_ids(before=posts[1].id)
+        self.assertEqual(post_ids, [posts[0].id])
+        self.assertIsNone(next_link)
+
+    def test_feed_skips_unpublished_posts(self):
+        notify_followers(self.post.id)
+        Post.objects.filter(id=self.post.id).update(status=StatusChoices.DRAFT)
+
+        self.assertEqual(self.get_feed_ids()[0], [])
+
+    def test_rejects_invalid_before(self):
+        response = self.client.get('/api/feed/', {'before': 'latest'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_renders_in_the_browsable_api(self):
+        notify_followers(self.post.id)
+
+        response = self.client.get('/api/feed/', headers={'accept': 'text/html'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, self.post.caption)
+
+
+class TimelineFanOutTests(TimelineTestCase):
+    @override_settings(TIMELINE_FANOUT_CHUNK_SIZE=1, TIMELINE_FANOUT_BATCH_SIZE=1)
+    def test_fans_out_to_every_follower_in_chunks(self):
+        other_follower = self.create_user(3)
+        other_follower.followings.create(following=self.user)
+
+        notify_followers(self.post.id)
+
+        self.assertEqual(fan_out_post.delay.call_count, 2)
+        self.assertEqual(self.get_feed_ids()[0], [self.post.id])
+        self.assertEqual(self.follower.notifications.count(), 1)
+        self.assertEqual(other_follower.notifications.count(), 1)
+
+    @override_settings(TIMELINE_CELEBRITY_THRESHOLD=1)
+    def test_merges_celebrity_posts_at_read_time(self):
+        notify_followers(self.post.id)
+        fanned_out = self.create_post(author=self.create_user(3))
+        TimelineManager.push_post([self.follower.id], fanned_out.id)
+
+        connection = TimelineManager.get_connection()
+        self.assertEqual(connection.zcard(TimelineManager.timeline_key(self.follower.id)), 1)
+        self.assertEqual(self.get_feed_ids()[0], [fanned_out.id, self.post.id])
+        self.assertEqual(self.follower.notifications.count(), 1)
+
+    @override_settings(TIMELINE_CELEBRITY_THRESHOLD=1)
+    def test_skips_celebrities_not_followed(self):
+        notify_followers(self.post.id)
+        self.client.force_authenticate(self.create_user(3))
+
+        self.assertEqual(self.get_feed_ids()[0], [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+class PostSearchTests(PostTestCase):
+    def search(self, term, **params):
+        response = self.client.get('/api/posts/', {'search': term, **params})
+        return [post['id'] for post in response.data['results']]
+
+    def test_ranks_matching_posts(self):
+        self.post.caption = 'A sunset'
+        self.post.save()
+        best = self.create_post(caption='Sunset over the beach, what a sunset')
+        self.create_post(caption='Morning coffee')
+
+        self.assertEqual(self.search('sunset'), [best.id, self.post.id])
+        self.assertEqual(self.search('sunsets'), [])  # The `simple` configuration does not stem
+
+    def test_websearch_syntax(self):
+        beach = self.create_post(caption='Sunset on the beach')
+        self.create_post(caption='Sunset in the city')
+
+        self.assertEqual(self.search('sunset -city', search_type='websearch'), [beach.id])
+
+
+class BenchmarkCleanupTests(PostTestCase):
+    def test_deletes_benchmark_posts_in_batches(self):
+        author = self.create_user(2, username='search_benchmark')
+        posts = [self.create_post(author=author) for _ in range(3)]
+        comment = self.create_comment(post=posts[0])
+        self.create_comment(post=posts[0], parent=comment)
+        Reaction.objects.create(user=self.user, comment=comment, reaction_type=ReactionChoices.LIKE)
+        posts[1].set_tags(['benchmark'])
+
+        receiver = mock.Mock()
+        post_delete.connect(receiver, sender=Post, weak=False)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Post)
+
+        call_command('benchmark_post_search', cleanup=True, batch_size=2, stdout=StringIO())
+
+        receiver.assert_not_called()  # Rows are deleted without loading them
+        self.assertFalse(Post.objects.filter(author=author).exists())
+        self.assertFalse(Comment.objects.filter(post__in=posts).exists())
+        self.assertTrue(Post.objects.filter(id=self.post.id).exists())
+        self.assertTrue(Tag.objects.filter(name='benchmark').exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Trigram search requires PostgreSQL')
+class TagSearchTests(PostTestCase):
+    def test_orders_tags_by_similarity(self):
+        Tag.objects.bulk_create([Tag(name='photography'), Tag(name='photo'), Tag(name='travel')])
+
+        response = self.client.get('/api/tags/', {'search': 'photo'})
+        self.assertEqual([tag['name'] for tag in response.data['results']][:2], ['photo', 'photography'])
+
+
+class TagFilterTests(PostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post.set_tags(['travel', 'food'])
+        self.travel = self.create_post()
+        self.travel.set_tags(['travel'])
+        self.create_post().set_tags(['music'])
+
+    def filter(self, **params):
+        response = self.client.get('/api/posts/', params)
+        return sorted(post['id'] for post in response.data['results'])
+
+    def test_any_of_the_tags(self):
+        expected = sorted([self.post.id, self.travel.id])
+        self.assertEqual(self.filter(tags_any='travel, food'), expected)
+        self.assertEqual(self.filter(tags='travel'), expected)
+
+    def test_all_of_the_tags(self):
+        self.assertEqual(self.filter(tags_all='travel,food'), [self.post.id])
+
+    def test_posts_are_not_duplicated(self):
+        self.assertEqual(self.filter(tags_any='travel,food,music,other'), sorted(
+            Post.objects.filter(status=StatusChoices.PUBLISHED).values_list('id', flat=True)
+        ))
+
+
+class PostTagsTests(PostTestCase):
+    def test_get_or_create_many_creates_missing_tags(self):
+        Tag.objects.create(name='travel')
+
+        with self.assertNumQueries(1):
+            self.assertEqual([tag.name for tag in Tag.get_or_create_many(['travel'])], ['travel'])
+
+        tags = Tag.get_or_create_many(['travel', 'food', 'food'])
+        self.assertEqual(sorted(tag.name for tag in tags), ['food', 'travel'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_set_tags_replaces_tags(self):
+        self.post.set_tags(['travel', 'food'])
+        self.post.set_tags(['food', 'music'])
+
+        self.assertEqual(sorted(self.post.tags.values_list('name', flat=True)), ['food', 'music'])
+
+    def test_extract_hashtags(self):
+        self.assertEqual(Post.extract_hashtags('Sunset #travel #Food, #travel'), ['travel', 'Food'])
+
+    def test_caption_hashtags_are_added_to_the_tags(self):
+        self.post.set_tags(['travel'])
+
+        serializer = PostListSerializer(self.post, data={'caption': 'Dinner #food'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(sorted(self.post.tags.values_list('name', flat=True)), ['food', 'travel'])
+
+    def test_rejects_too_many_tags(self):
+        serializer = PostListSerializer(self.post, data={'tags': ['a', 'b', 'c', 'd', 'e', 'f']}, partial=True)
+
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError):
+            serializer.save()
+
+    def test_skips_caption_hashtags_beyond_the_limit(self):
+        serializer = PostListSerializer(self.post, data={'tags': ['a', 'b', 'c'], 'caption': '#d #e #f'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(sorted(self.post.tags.values_list('name', flat=True)), ['a', 'b', 'c', 'd', 'e'])
+
+        serializer = PostListSerializer(self.post, data={'caption': 'Edited #g'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()  # The post already has 5 tags
+
+        self.assertEqual(self.post.caption, 'Edited #g')
+        self.assertEqual(self.post.tags.count(), 5)
+
+    def test_posts_are_not_created_without_their_tags(self):
+        serializer = PostListSerializer()
+        data = {'author': self.user, 'caption': 'Sunset #travel', 'image': 'posts/image.jpg'}
+
+        with mock.patch.object(Post, 'set_tags', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            serializer.create(data)
+
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class PostImageTestCase(PostTestCase):
+    """
+    Base test case storing uploaded images in a temporary media directory.
+    """
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+    def create_image(self, size=(1600, 1200), color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, format='JPEG')
+        return ContentFile(buffer.getvalue(), name='image.jpg')
+
+    def create_image_post(self, image=None, **kwargs):
+        post = self.create_post(**kwargs)
+        post.image.save('image.jpg', image or self.create_image())
+        return post
+
+
+class ImageVariantTests(PostImageTestCase):
+    @override_settings(POST_IMAGE_VARIANTS={'thumbnail': 150, 'full': 2000})
+    def test_generates_resized_variants_without_upscaling(self):
+        post = self.create_image_post()
+
+        generate_image_variants(post.id)
+
+        sizes = {
+            (variant.kind, variant.image_format): (variant.width, variant.height)
+            for variant in post.image_variants.all()
+        }
+        self.assertEqual(sizes, {
+            ('thumbnail', 'webp'): (150, 113), ('thumbnail', 'jpeg'): (150, 113),
+            ('full', 'webp'): (1600, 1200), ('full', 'jpeg'): (1600, 1200),
+        })
+
+    def test_deletes_variant_files_with_the_post(self):
+        post = self.create_image_post()
+        generate_image_variants(post.id)
+        variants = list(post.image_variants.all())
+        storage = variants[0].image.storage
+        self.assertTrue(all(storage.exists(variant.image.name) for variant in variants))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+        self.assertFalse(any(storage.exists(variant.image.name) for variant in variants))
+
+
+class ImageBlobTests(PostImageTestCase):
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_image_post()
+        second = self.create_image_post()
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).ref_count, 2)
+
+    def test_deletes_the_file_with_its_last_reference(self):
+        first = self.create_image_post()
+        second = self.create_image_post()
+        name, storage = first.image.name, first.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_releases_a_replaced_image(self):
+        post = self.create_image_post()
+        name, storage = post.image.name, post.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.image.save('image.jpg', self.create_image(color='blue'))
+
+        self.assertNotEqual(post.image.name, name)
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).ref_count, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PostDetailCacheTests(PostTestCase):
+    def get_detail(self):
+        response = self.client.get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_serves_cached_details(self):
+        self.get_detail()
+        Post.objects.filter(id=self.post.id).update(caption='Changed without signals')
+
+        self.assertEqual(self.get_detail().data['caption'], 'A post')
+
+    def test_comments_invalidate_the_details(self):
+        self.get_detail()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = self.create_comment()
+
+        self.assertEqual([c['id'] for c in self.get_detail().data['comments']], [comment.id])
+
+    def test_adds_the_reaction_of_each_user(self):
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+        self.assertEqual(self.get_detail().data['my_reaction'], ReactionChoices.LIKE)
+
+        self.client.force_authenticate(self.create_user(2))
+        self.assertIsNone(self.get_detail().data['my_reaction'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PostListETagTests(PostTestCase):
+    def get_list(self, **headers):
+        return self.client.get('/api/posts/', headers=headers)
+
+    def test_answers_not_modified(self):
+        etag = self.get_list()['ETag']
+
+        response = self.get_list(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_changes_change_the_etag(self):
+        etag = self.get_list()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.set_tags(['travel'])
+
+        response = self.get_list(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['tags'], ['travel'])
+
+    def test_comments_and_reactions_of_others_keep_the_etag(self):
+        etag = self.get_list()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_comment()
+            Reaction.objects.create(user=self.create_user(2), post=self.post, reaction_type=ReactionChoices.LIKE)
+
+        self.assertEqual(self.get_list(if_none_match=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_own_reactions_change_the_etag(self):
+        etag = self.get_list()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+
+        response = self.get_list(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['my_reaction'], ReactionChoices.LIKE)
+
+    def test_author_renames_change_the_etag(self):
+        etag = self.get_list()['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renamed'
+            self.user.save()
+
+        response = self.get_list(if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['author_username'], 'renamed')
+
+    def test_etag_depends_on_the_filters(self):
+        etag = self.get_list()['ETag']
+
+        response = self.client.get('/api/posts/', {'tags': 'travel'}, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(REACTION_WRITE_BEHIND=True)
+class ReactionBufferTests(PostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = ReactionBuffer.target(post_id=self.post.id)
+        self.addCleanup(self.clear_buffer)
+
+    def clear_buffer(self):
+        connection = ReactionBuffer.get_connection()
+        keys = list(connection.scan_iter('reactions:*'))
+        if keys:
+            connection.delete(*keys)
+
+    def react(self, reaction, user=None):
+        self.client.force_authenticate(user or self.user)
+        return self.client.post(
+            '/api/reaction/', {'reaction': reaction, 'post': self.post.id, 'comment': None}, format='json'
+        )
+
+    def assertCounters(self, likes, dislikes):
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.dislikes_count), (likes, dislikes))
+
+    def test_buffers_toggles_until_flushed(self):
+        other = self.create_user(2)
+        self.assertEqual(self.react(ReactionChoices.LIKE).status_code, status.HTTP_201_CREATED)
+        self.react(ReactionChoices.LIKE, user=other)
+        self.react(ReactionChoices.DISLIKE, user=other)  # Flip
+        self.assertFalse(Reaction.objects.exists())
+
+        self.assertEqual(flush_reaction_buffer(), 2)
+
+        self.assertEqual(dict(Reaction.objects.values_list('user_id', 'reaction_type')), {
+            self.user.id: ReactionChoices.LIKE, other.id: ReactionChoices.DISLIKE
+        })
+        self.assertCounters(1, 1)
+
+    def test_answers_like_the_database_path(self):
+        buffered = self.react(ReactionChoices.LIKE)
+        with override_settings(REACTION_WRITE_BEHIND=False):
+            stored = self.react(ReactionChoices.LIKE, user=self.create_user(2))
+
+        self.assertEqual(buffered.status_code, stored.status_code)
+        self.assertEqual(set(buffered.data), set(stored.data))
+        self.assertEqual(buffered.data['reaction_type'], ReactionChoices.LIKE)
+
+    def test_concurrent_toggles_are_not_lost(self):
+        def get_stored():
+            if not get_stored.called:
+                get_stored.called = True
+                ReactionBuffer.toggle(self.target, self.user.id, ReactionChoices.LIKE, lambda: None)  # In between
+            return None
+
+        get_stored.called = False
+        ReactionBuffer.toggle(self.target, self.user.id, ReactionChoices.LIKE, get_stored)
+
+        self.assertEqual(ReactionBuffer.get_state(self.target, self.user.id), ReactionBuffer.REMOVED)
+
+    def test_removes_stored_reactions(self):
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+        Post.objects.filter(id=self.post.id).update(likes_count=1)
+
+        self.react(ReactionChoices.LIKE)
+        flush_reaction_buffer()
+
+        self.assertFalse(Reaction.objects.exists())
+        self.assertCounters(0, 0)
+
+    def test_flushes_toggles_buffered_behind_a_failed_flush(self):
+        self.react(ReactionChoices.LIKE)
+        with mock.patch.object(Reaction, 'apply_buffered', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_reaction_buffer()  # Leaves the toggles aside in the `:flushing` hash
+
+        other = self.create_user(2)
+        self.react(ReactionChoices.DISLIKE, user=other)
+
+        flush_reaction_buffer()  # Saves the toggles left aside
+        flush_reaction_buffer()  # Saves the newer ones
+
+        self.assertEqual(Reaction.objects.count(), 2)
+        self.assertCounters(1, 1)
+
+
+class MyReactionTests(PostTestCase):
+    def test_lists_the_reactions_of_the_user_with_one_query(self):
+        other_post = self.create_post()
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+        Reaction.objects.create(user=self.create_user(2), post=other_post, reaction_type=ReactionChoices.LIKE)
+
+        with self.assertNumQueries(1):
+            Reaction.get_user_reactions(self.user, post_ids=[self.post.id, other_post.id])
+
+        response = self.client.get('/api/posts/')
+        reactions = {post['id']: post['my_reaction'] for post in response.data['results']}
+        self.assertEqual(reactions, {self.post.id: ReactionChoices.LIKE, other_post.id: None})
+
+    def test_anonymous_users_have_no_reactions(self):
+        Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+        self.client.force_authenticate(None)
+
+        response = self.client.get('/api/posts/')
+        self.assertIsNone(response.data['results'][0]['my_reaction'])
+
+
+class ReactionListTests(PostTestCase):
+    def setUp(self):
+        super().setUp()
+        reaction_types = [ReactionChoices.LIKE, ReactionChoices.DISLIKE, ReactionChoices.LIKE]
+        for number, reaction_type in enumerate(reaction_types, start=2):
+            user = self.create_user(number, username=f'user{number}')
+            Reaction.objects.create(user=user, post=self.post, reaction_type=reaction_type)
+
+    def test_pages_reactions_newest_first(self):
+        response = self.client.get(f'/api/posts/{self.post.id}/reactions/', {'page_size': 2})
+        self.assertEqual([r['username'] for r in response.data['results']], ['user4', 'user3'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['username'] for r in response.data['results']], ['user2'])
+
+    def test_filters_by_type(self):
+        response = self.client.get(f'/api/posts/{self.post.id}/reactions/', {'type': ReactionChoices.LIKE})
+        self.assertEqual([r['username'] for r in response.data['results']], ['user4', 'user2'])
+
+    def test_lists_comment_reactions(self):
+        comment = self.create_comment()
+        Reaction.objects.create(user=self.user, comment=comment, reaction_type=ReactionChoices.LIKE)
+
+        response = self.client.get(f'/api/comments/{comment.id}/reactions/')
+        self.assertEqual([r['username'] for r in response.data['results']], ['author'])
+
+    def test_hides_unpublished_targets(self):
+        Post.objects.filter(id=self.post.id).update(status=StatusChoices.DRAFT)
+
+        response = self.client.get(f'/api/posts/{self.post.id}/reactions/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    COMMENT_TREE_MAX_DEPTH=2
+)
+class CommentRepliesTests(PostTestCase):
+    def test_details_nest_replies_down_to_the_max_depth(self):
+        comment = self.create_comment()
+        reply = self.create_comment(parent=comment)
+        self.create_comment(parent=reply)
+
+        response = self.client.get(f'/api/posts/{self.post.id}/')
+        nested = response.data['comments'][0]['replies'][0]
+        self.assertEqual(nested['id'], reply.id)
+        self.assertEqual(nested['replies'], [])
+        self.assertEqual(nested['reply_count'], 1)
+
+    def test_reply_counts_only_count_published_replies(self):
+        comment = self.create_comment()
+        self.create_comment(parent=comment)
+        draft = self.create_comment(parent=comment, status=StatusChoices.DRAFT)
+        comment.refresh_from_db()
+        self.assertEqual(comment.reply_count, 1)
+
+        draft.status = StatusChoices.PUBLISHED
+        draft.save()
+        comment.refresh_from_db()
+        self.assertEqual(comment.reply_count, 2)
+
+    def test_pages_replies_oldest_first(self):
+        comment = self.create_comment()
+        replies = [self.create_comment(parent=comment) for _ in range(3)]
+        self.create_comment(parent=replies[0])  # Not a direct reply
+
+        response = self.client.get(f'/api/comments/{comment.id}/replies/', {'page_size': 2})
+        self.assertEqual([reply['id'] for reply in response.data['results']], [replies[0].id, replies[1].id])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([reply['id'] for reply in response.data['results']], [replies[2].id])
+
+
+class CommentPathTests(PostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.comment = self.create_comment()
+        self.reply = self.create_comment(parent=self.comment)
+        self.nested_reply = self.create_comment(parent=self.reply)
+        self.sibling = self.create_comment()
+
+    def clear_paths(self):
+        Comment.objects.update(path='', depth=0)  # Like comments saved before the column existed
+        for comment in (self.comment, self.reply, self.nested_reply, self.sibling):
+            comment.refresh_from_db()
+
+    def test_paths_follow_the_thread(self):
+        self.assertEqual(self.reply.path, f'{self.comment.path}{Comment.path_segment(self.reply.id)}')
+        self.assertEqual(
+            list(self.comment.get_subtree()), [self.comment, self.reply, self.nested_reply]
+        )
+
+    def test_moving_a_reply_moves_its_subtree(self):
+        self.reply.parent = self.sibling
+        self.reply.save()
+
+        self.nested_reply.refresh_from_db()
+        self.assertTrue(self.nested_reply.path.startswith(self.sibling.path))
+        self.assertEqual(self.nested_reply.depth, 2)
+        self.assertEqual(list(self.comment.get_subtree()), [self.comment])
+
+    def move(self, comment, parent):
+        return self.client.patch(f'/api/comments/{comment.id}/', {'parent': parent.id}, format='json')
+
+    def test_comments_cannot_move_into_their_own_subtree(self):
+        for parent in (self.comment, self.nested_reply):
+            response = self.move(self.comment, parent)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.move(self.nested_reply, self.sibling).status_code, status.HTTP_200_OK)
+        self.assertEqual(list(self.comment.get_subtree()), [self.comment, self.reply])
+
+    def test_comments_cannot_move_to_another_post(self):
+        other_comment = self.create_comment(post=self.create_post())
+
+        response = self.move(self.reply, other_comment)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replies_are_created_on_the_post_of_their_parent(self):
+        other_post = self.create_post()
+
+        response = self.client.post(
+            '/api/comments/create/', {'post_id': other_post.id, 'parent': self.comment.id, 'content': 'A reply'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.get(id=response.data['id']).post_id, self.post.id)
+
+    def test_deleting_a_comment_deletes_its_subtree(self):
+        response = self.client.delete(f'/api/comments/{self.comment.id}/', headers={'accept': 'application/json'})
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Comment.objects.all()), [self.sibling])
+
+    def test_deleting_a_comment_without_path_keeps_the_other_threads(self):
+        self.clear_paths()
+        with self.assertRaises(ValueError):
+            self.comment.get_subtree()
+
+        response = self.client.delete(f'/api/comments/{self.comment.id}/', headers={'accept': 'application/json'})
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Comment.objects.all()), [self.sibling])
+
+    def test_comment_without_path_lists_its_direct_replies(self):
+        self.clear_paths()
+
+        root, = build_comment_tree(self.post, root=self.comment)
+        self.assertEqual(root.tree_replies, [self.reply])
+
+    def test_missing_paths_are_filled_after_migrate(self):
+        paths = dict(Comment.objects.values_list('id', 'path'))
+        self.clear_paths()
+
+        fill_comment_paths(sender=apps.get_app_config('posts'), apps=apps)
+
+        self.assertEqual(dict(Comment.objects.values_list('id', 'path')), paths)
+        self.assertEqual(Comment.objects.get(id=self.nested_reply.id).depth, 2)
+
+    def test_missing_paths_are_filled_after_flush(self):
+        paths = dict(Comment.objects.values_list('id', 'path'))
+        self.clear_paths()
+
+        fill_comment_paths(sender=apps.get_app_config('posts'))  # `flush` sends post_migrate without `apps`
+
+        self.assertEqual(dict(Comment.objects.values_list('id', 'path')), paths)
+
+
+class GraphQLTestCase(PostTestCase):
+    """
+    Base test case running GraphQL operations as the logged in user (responses are not cached).
+    """
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.addCleanup(documents.documents.clear)  # Validated under the settings of the test
+
+    def execute(self, query, variables=None, **extra):
+        response = self.client.post('/graphql/', {'query': query, 'variables': variables or {}}, format='json', **extra)
+        return response.json()
+
+    def count_queries(self, query, variables=None):
+        with CaptureQueriesContext(connection) as context:
+            result = self.execute(query, variables)
+        self.assertNotIn('errors', result)
+        return len(context.captured_queries)
+
+    def create_thread(self, number):
+        """
+        Creates a tagged post with a comment, a reply and reactions, by a new author.
+        """
+        author = self.create_user(100 + number)
+        post = self.create_post(author=author)
+        post.set_tags([f'tag{number}', 'all'])
+        comment = self.create_comment(post=post)
+        self.create_comment(post=post, parent=comment)
+        Reaction.objects.create(user=author, post=post, reaction_type=ReactionChoices.LIKE)
+        Reaction.objects.create(user=author, comment=comment, reaction_type=ReactionChoices.LIKE)
+        return post
+
+
+@override_settings(GRAPHQL_MAX_COST=100_000)
+class GraphQLBatchLoadingTests(GraphQLTestCase):
+    QUERY = """{
+        posts(first: 50) { edges { node {
+            author { username }
+            tags { name posts { id } }
+            comments { author { username } replies { author { username } } reactions { user { username } } }
+            reactions { user { username } }
+        } } }
+    }"""
+
+    def test_query_count_does_not_grow_with_the_results(self):
+        self.create_thread(1)
+        queries = self.count_queries(self.QUERY)
+
+        for number in range(2, 6):
+            self.create_thread(number)
+        self.assertEqual(self.count_queries(self.QUERY), queries)
+
+    def test_batch_load_must_be_implemented(self):
+        class IncompleteLoader(BatchLoader):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteLoader(Loaders())
+
+
+class GraphQLQueryShapingTests(GraphQLTestCase):
+    def capture(self, query, variables=None):
+        with CaptureQueriesContext(connection) as context:
+            result = self.execute(query, variables)
+        self.assertNotIn('errors', result)
+        # Leave out the session and user lookups of the login
+        return [captured['sql'] for captured in context.captured_queries if 'posts_post' in captured['sql']]
+
+    def test_selects_only_the_requested_columns(self):
+        queries = self.capture('{ posts { edges { node { id } } } }')
+
+        self.assertNotIn('caption', queries[-1])
+        self.assertNotIn('search_vector', queries[-1])
+
+    def test_joins_selected_foreign_keys(self):
+        queries = self.capture(
+            'query ($id: Int!) { post(id: $id) { caption author { username } } }', {'id': self.post.id}
+        )
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('JOIN', queries[0])
+
+
+class GraphQLQueryCostTests(GraphQLTestCase):
+    QUERY = 'query %s { posts(first: %s) { edges { node { comments { author { username } } } } } }'
+
+    def get_errors(self, query, variables=None):
+        return [error['message'] for error in self.execute(query, variables).get('errors', [])]
+
+    def test_prices_literal_sizes(self):
+        self.assertEqual(self.get_errors(self.QUERY % ('', 5)), [])
+        self.assertEqual(
+            self.get_errors(self.QUERY % ('', 50)), ["Operation '<anonymous>' costs 1101, the maximum is 1000."]
+        )
+
+    def test_prices_variable_sizes_at_the_largest_page(self):
+        errors = self.get_errors(self.QUERY % ('($first: Int)', '$first'), {'first': 5})
+
+        self.assertEqual(errors, ["Operation '<anonymous>' costs 2201, the maximum is 1000."])
+
+    @override_settings(GRAPHQL_MAX_COST=100)
+    def test_prices_total_count_once_per_connection(self):
+        errors = self.get_errors('{ posts(first: 50) { totalCount pageInfo { hasNextPage } edges { node { id } } } }')
+
+        self.assertEqual(errors, ["Operation '<anonymous>' costs 112, the maximum is 100."])
+
+    def test_rejects_deep_operations(self):
+        errors = self.get_errors(
+            '{ posts { edges { node { comments { post { comments { post { comments { id } } } } } } } } }'
+        )
+
+        self.assertEqual(errors, ["Operation '<anonymous>' is nested 8 levels deep, the maximum is 6."])
+
+
+class GraphQLConnectionTests(GraphQLTestCase):
+    QUERY = """query ($first: Int, $after: String) {
+        posts(first: $first, after: $after) { totalCount pageInfo { hasNextPage endCursor } edges { node { id } } }
+    }"""
+
+    def get_page(self, **variables):
+        result = self.execute(self.QUERY, variables)
+        self.assertNotIn('errors', result)
+        return result['data']['posts']
+
+    def get_ids(self, page):
+        return [int(edge['node']['id']) for edge in page['edges']]
+
+    @override_settings(GRAPHQL_DEFAULT_LIST_SIZE=2, GRAPHQL_MAX_LIST_SIZE=3)
+    def test_page_sizes_follow_the_cost_settings(self):
+        for _ in range(4):
+            self.create_post()
+
+        self.assertEqual(len(self.get_page()['edges']), 2)
+        self.assertEqual(len(self.get_page(first=50)['edges']), 3)
+
+    def test_walks_pages_with_cursors(self):
+        posts = [self.post] + [self.create_post() for _ in range(4)]
+        newest_first = [post.id for post in reversed(posts)]
+
+        first_page = self.get_page(first=3)
+        second_page = self.get_page(first=3, after=first_page['pageInfo']['endCursor'])
+
+        self.assertEqual(self.get_ids(first_page) + self.get_ids(second_page), newest_first)
+        self.assertTrue(first_page['pageInfo']['hasNextPage'])
+        self.assertFalse(second_page['pageInfo']['hasNextPage'])
+        self.assertEqual(second_page['totalCount'], 5)
+
+    def test_cursors_match_the_rest_cursors(self):
+        self.create_post()
+
+        end_cursor = self.get_page(first=1)['pageInfo']['endCursor']
+        response = self.client.get('/api/posts/', {'page_size': 1}, headers={'accept': 'application/json'})
+        next_link = response.data['next']
+
+        self.assertEqual(parse_qs(urlparse(next_link).query)['cursor'], [end_cursor])
+
+    def test_rejects_invalid_cursors(self):
+        result = self.execute(self.QUERY, {'after': 'invalid'})
+
+        self.assertEqual([error['message'] for error in result['errors']], ['Invalid cursor'])
+
+
+class GraphQLPersistedQueryTests(GraphQLTestCase):
+    QUERY = '{ posts(first: 1) { edges { node { caption } } } }'
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.clear_queries)
+
+    def clear_queries(self):
+        connection = PersistedQueries.get_connection()
+        keys = list(connection.scan_iter('graphql:query:*'))
+        if keys:
+            connection.delete(*keys)
+
+    def execute_persisted(self, query_hash, query=None):
+        data = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': query_hash}}}
+        if query is not None:
+            data['query'] = query
+        return self.client.post('/graphql/', data, format='json').json()
+
+    def get_error_codes(self, result):
+        return [error['extensions']['code'] for error in result.get('errors', [])]
+
+    def test_registers_queries_sent_with_their_hash(self):
+        query_hash = PersistedQueries.get_hash(self.QUERY)
+        self.assertEqual(self.get_error_codes(self.execute_persisted(query_hash)), ['PERSISTED_QUERY_NOT_FOUND'])
+
+        self.assertNotIn('errors', self.execute_persisted(query_hash, self.QUERY))
+        result = self.execute_persisted(query_hash)
+
+        self.assertEqual(result['data']['posts']['edges'][0]['node']['caption'], self.post.caption)
+        self.assertEqual(PersistedQueries.get(query_hash), self.QUERY)
+
+    def test_never_registers_invalid_queries(self):
+        for query in ('{ posts { edges { node { unknown } } } }', 'not a query'):
+            query_hash = PersistedQueries.get_hash(query)
+
+            self.assertIn('errors', self.execute_persisted(query_hash, query))
+            self.assertIsNone(PersistedQueries.get(query_hash))
+
+    def test_rejects_mismatched_hashes(self):
+        result = self.execute_persisted(PersistedQueries.get_hash('{ tags { edges { node { name } } } }'), self.QUERY)
+
+        self.assertEqual(self.get_error_codes(result), ['INVALID_PERSISTED_QUERY'])
+        self.assertIsNone(PersistedQueries.get(PersistedQueries.get_hash(self.QUERY)))
+
+    @override_settings(GRAPHQL_PERSISTED_QUERIES_ONLY=True)
+    def test_only_accepts_registered_queries(self):
+        query_hash = PersistedQueries.get_hash(self.QUERY)
+        self.assertEqual(self.get_error_codes(self.execute(self.QUERY)), ['PERSISTED_QUERY_NOT_SUPPORTED'])
+        self.assertEqual(
+            self.get_error_codes(self.execute_persisted(query_hash, self.QUERY)), ['PERSISTED_QUERY_NOT_FOUND']
+        )
+
+        PersistedQueries.register(self.QUERY)
+
+        self.assertNotIn('errors', self.execute_persisted(query_hash))
+
+    def test_register_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        valid, invalid = f'{directory}/posts.graphql', f'{directory}/invalid.graphql'
+        with open(valid, 'w') as file:
+            file.write(self.QUERY)
+        with open(invalid, 'w') as file:
+            file.write('{ posts { edges { node { unknown } } } }')
+
+        with self.assertRaises(CommandError):
+            call_command('register_graphql_queries', valid, invalid, stdout=StringIO())
+        self.assertIsNone(PersistedQueries.get(PersistedQueries.get_hash(self.QUERY)))
+
+        call_command('register_graphql_queries', valid, stdout=StringIO())
+        self.assertEqual(PersistedQueries.get(PersistedQueries.get_hash(self.QUERY)), self.QUERY)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+@override_settings(GRAPHQL_SUBSCRIPTION_COALESCE_WINDOW=0.2)
+class GraphQLSubscriptionTests(TransactionTestCase):
+    """
+    Subscriptions over WebSocket; transactional, as events are only sent once writes commit.
+    """
+    POST_UPDATED = 'subscription ($id: Int!) { postUpdated(id: $id) { caption } }'
+
+    def setUp(self):
+        self.user = User.objects.create_user(mobile='09120000001', username='author')
+        self.post = Post.objects.create(
+            author=self.user, image='posts/image.jpg', caption='A post', status=StatusChoices.PUBLISHED
+        )
+        self.addCleanup(documents.documents.clear)
+
+    async def connect(self, token=True):
+        headers = [(b'authorization', f'Bearer {AccessToken.for_user(self.user)}'.encode())] if token else []
+        communicator = WebsocketCommunicator(
+            application, '/ws/graphql/', headers=headers, subprotocols=['graphql-transport-ws']
+        )
+        connected, _ = await communicator.connect()
+        if connected:
+            await communicator.send_json_to({'type': 'connection_init'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'connection_ack'})
+        return communicator, connected
+
+    async def subscribe(self, communicator, subscription_id, query, variables=None):
+        await communicator.send_json_to({
+            'id': subscription_id, 'type': 'subscribe', 'payload': {'query': query, 'variables': variables or {}}
+        })
+
+    async def test_rejects_anonymous_connections(self):
+        _, connected = await self.connect(token=False)
+
+        self.assertFalse(connected)
+
+    async def test_sends_post_updates(self):
+        communicator, _ = await self.connect()
+        await self.subscribe(communicator, '1', self.POST_UPDATED, {'id': self.post.id})
+        await communicator.receive_nothing()
+
+        self.post.caption = 'Edited'
+        await database_sync_to_async(self.post.save)()
+
+        self.assertEqual(await communicator.receive_json_from(), {
+            'id': '1', 'type': 'next', 'payload': {'data': {'postUpdated': {'caption': 'Edited'}}}
+        })
+        await communicator.disconnect()
+
+    async def test_coalesces_post_updates(self):
+        communicator, _ = await self.connect()
+        await self.subscribe(communicator, '1', self.POST_UPDATED, {'id': self.post.id})
+        await communicator.receive_nothing()
+
+        for caption in ('First', 'Second', 'Third'):
+            self.post.caption = caption
+            await database_sync_to_async(self.post.save)()
+
+        self.assertEqual(await communicator.receive_json_from(), {
+            'id': '1', 'type': 'next', 'payload': {'data': {'postUpdated': {'caption': 'Third'}}}
+        })
+        self.assertTrue(await communicator.receive_nothing(timeout=0.5))
+        await communicator.disconnect()
+
+    async def test_sends_every_comment(self):
+        communicator, _ = await self.connect()
+        query = 'subscription ($postId: Int!) { commentAdded(postId: $postId) { content } }'
+        await self.subscribe(communicator, '1', query, {'postId': self.post.id})
+        await communicator.receive_nothing()
+
+        for content in ('First', 'Second'):
+            await database_sync_to_async(Comment.objects.create)(
+                post=self.post, author=self.user, content=content, status=StatusChoices.PUBLISHED
+            )
+
+        messages = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertCountEqual(
+            [message['payload']['data']['commentAdded']['content'] for message in messages],
+            ['First', 'Second']
+        )
+        await communicator.disconnect()
+
+    async def test_stops_sending_completed_subscriptions(self):
+        communicator, _ = await self.connect()
+        await self.subscribe(communicator, '1', self.POST_UPDATED, {'id': self.post.id})
+        await communicator.send_json_to({'id': '1', 'type': 'complete'})
+        await communicator.receive_nothing()
+
+        await database_sync_to_async(self.post.save)()
+
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_rejects_other_operations(self):
+        communicator, _ = await self.connect()
+        await self.subscribe(communicator, '1', '{ posts { totalCount } }')
+
+        message = await communicator.receive_json_from()
+
+        self.assertEqual(message['type'], 'error')
+        self.assertEqual(
+            [error['message'] for error in message['payload']],
+            ['Only subscription operations are supported over WebSocket.']
+        )
+        await communicator.disconnect()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class GraphQLResponseCacheTests(PostTestCase):
+    QUERY = 'query ($id: Int!) { post(id: $id) { caption likesCount } }'
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(documents.documents.clear)
+
+    def get_post(self, query=QUERY):
+        response = self.client.post('/graphql/', {'query': query, 'variables': {'id': self.post.id}}, format='json')
+        return response.json()['data']['post']
+
+    def test_serves_cached_responses_to_anonymous_clients(self):
+        self.get_post()
+        Post.objects.filter(id=self.post.id).update(caption='Changed without signals')
+
+        self.assertEqual(self.get_post()['caption'], 'A post')
+
+    def test_reactions_leave_post_responses_cached(self):
+        reactions_query = 'query ($id: Int!) { post(id: $id) { reactions { reactionType } } }'
+        self.get_post()
+        self.get_post(reactions_query)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)
+            Reaction.update_counters(post_id=self.post.id, likes_count=1)
+
+        self.assertEqual(self.get_post()['likesCount'], 0)  # Until its cache hint expires
+        self.assertEqual(self.get_post(reactions_query)['reactions'], [{'reactionType': 'LIKE'}])
+
+    def test_reconcile_counters_invalidates_responses(self):
+        self.create_post()
+        self.get_post()
+        self.client.get(f'/api/posts/{self.post.id}/')
+        Reaction.objects.bulk_create([Reaction(user=self.user, post=self.post, reaction_type=ReactionChoices.LIKE)])
+
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_counters', stdout=output)
+
+        self.assertIn('Post: 1 rows reconciled.', output.getvalue())  # Only the drifted post
+        self.assertEqual(self.get_post()['likesCount'], 1)
+        self.assertEqual(self.client.get(f'/api/posts/{self.post.id}/').data['likes_count'], 1)
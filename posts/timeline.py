@@ -0,0 +1,104 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+
+import heapq
+
+
+class TimelineManager:
+    """
+    Manages users' home timelines stored in Redis sorted sets.
+
+    Each user has a sorted set of post IDs (scored by the post ID itself, so newer posts
+    always rank higher and cursors are exact). Posts are pushed into the timelines when
+    they are created (fan-out on write), and every timeline is capped to the newest
+    `TIMELINE_MAX_LENGTH` entries.
+
+    Authors with more than `TIMELINE_CELEBRITY_THRESHOLD` followers are not fanned out.
+    Their posts are kept in a per-author sorted set instead, and merged into the
+    followers' feeds at read time (fan-out on read).
+    """
+    CELEBRITIES_KEY = 'timeline:celebrities'
+
+    @staticmethod
+    def get_connection():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def timeline_key(user_id):
+        return f'timeline:{user_id}'
+
+    @staticmethod
+    def author_posts_key(author_id):
+        return f'timeline:author:{author_id}'
+
+    @classmethod
+    def push_post(cls, user_ids, post_id):
+        """
+        Pushes a post into the timelines of the given users.
+
+        Commands are sent through a non-transactional pipeline which is flushed every
+        `TIMELINE_FANOUT_BATCH_SIZE` users, so fanning out to many followers costs a few
+        round trips instead of one per follower.
+        """
+        batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+        max_length = settings.TIMELINE_MAX_LENGTH
+        pipe = cls.get_connection().pipeline(transaction=False)
+
+        for index, user_id in enumerate(user_ids, start=1):
+            key = cls.timeline_key(user_id)
+            pipe.zadd(key, {post_id: post_id})
+            pipe.zremrangebyrank(key, 0, -(max_length + 1))  # Keep only the newest entries
+
+            if index % batch_size == 0:
+                pipe.execute()
+
+        pipe.execute()
+
+    @classmethod
+    def push_author_post(cls, author_id, post_id):
+        """
+        Stores a post of a celebrity author in the author's recent posts,
+        and marks the author as a celebrity.
+        """
+        key = cls.author_posts_key(author_id)
+        pipe = cls.get_connection().pipeline(transaction=False)
+        pipe.zadd(key, {post_id: post_id})
+        pipe.zremrangebyrank(key, 0, -(settings.TIMELINE_AUTHOR_POSTS_LENGTH + 1))
+        pipe.sadd(cls.CELEBRITIES_KEY, author_id)
+        pipe.execute()
+
+    @classmethod
+    def get_celebrity_ids(cls):
+        """
+        Returns the IDs of the authors whose posts are merged into feeds at read time.
+        """
+        return [int(author_id) for author_id in cls.get_connection().smembers(cls.CELEBRITIES_KEY)]
+
+    @classmethod
+    def get_post_ids(cls, user_id, before=None, count=20, celebrity_ids=()):
+        """
+        Returns up to `count` post IDs of the user's timeline, newest first.
+
+        If `before` is given, only posts older than that post ID are returned.
+        The recent posts of the given (followed) celebrity authors are merged in.
+        """
+        maximum = f'({before}' if before else '+inf'  # `(` makes the bound exclusive
+        keys = [cls.timeline_key(user_id)] + [cls.author_posts_key(author_id) for author_id in celebrity_ids]
+
+        # Read the user's timeline and every celebrity's posts in a single round trip
+        pipe = cls.get_connection().pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrangebyscore(key, maximum, '-inf', start=0, num=count)
+
+        sources = [[int(post_id) for post_id in post_ids] for post_ids in pipe.execute()]
+
+        # Every source is already sorted newest first, so a k-way merge keeps the order
+        post_ids = []
+        for post_id in heapq.merge(*sources, reverse=True):
+            if post_ids and post_ids[-1] == post_id:
+                continue
+            post_ids.append(post_id)
+            if len(post_ids) == count:
+                break
+
+        return post_ids
@@ -2,9 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     PostViewSet,
+    FeedView,
     CommentCreateView,
     CommentDetailView,
+    CommentRepliesView,
     ReactionToggleView,
+    ReactionListView,
     TagView
 )
 
@@ -12,8 +15,12 @@ router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 
 urlpatterns = [
+    path('feed/', FeedView.as_view(), name='feed'),
     path('comments/create/', CommentCreateView.as_view(), name='comment_create'),
     path('comments/<int:pk>/', CommentDetailView.as_view(), name='comment_detail'),
+    path('comments/<int:pk>/replies/', CommentRepliesView.as_view(), name='comment_replies'),
+    path('comments/<int:pk>/reactions/', ReactionListView.as_view(target='comment'), name='comment_reactions'),
+    path('posts/<int:pk>/reactions/', ReactionListView.as_view(target='post'), name='post_reactions'),
     path('reaction/', ReactionToggleView.as_view(), name='reaction'),
     path('tags/', TagView.as_view(), name='reaction'),
 
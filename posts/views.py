@@ -1,41 +1,108 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, permissions, filters, generics, status
+from rest_framework import viewsets, permissions, generics, status
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 
-from .tasks import notify_followers
+from utils.filters import TrigramSearchFilter
+from utils.mixins import ConditionalGetMixin
+from utils.pagination import KeysetPagination
+from .cache import PostDetailCache
+from .comment_tree import build_comment_tree
+from .reaction_buffer import ReactionBuffer
+from .tasks import notify_followers, generate_image_variants
+from .timeline import TimelineManager
 from .permissions import IsAuthorOrReadOnly
-from .filters import PostFilter
-from .models import StatusChoices, Post, Comment, Tag
+from .filters import PostFilter, PostSearchFilter, ReactionFilter
+from .models import StatusChoices, Post, Comment, Reaction, Tag
 from .serializers import (
     PostListSerializer,
     PostDetailSerializer,
     CommentSerializer,
     ReactionSerializer,
+    ReactionUserSerializer,
     TagSerializer
 )
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class MyReactionsMixin:
+    """
+    Loads the reactions of the user to the serialized posts and comments with a single query,
+    for the `my_reaction` field of the serializers.
+
+    Pages pass them through the serializer context; already serialized (e.g. cached)
+    bodies are filled afterward with `add_my_reactions`.
+    """
+    my_reactions = None
+
+    def load_my_reactions(self, post_ids=(), comment_ids=()):
+        self.my_reactions = Reaction.get_user_reactions(self.request.user, post_ids, comment_ids)
+        return self.my_reactions
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['my_reactions'] = self.my_reactions or {}
+        return context
+
+    def add_my_reactions(self, data, kind):
+        """
+        Returns a copy of a serialized post or comment (`kind`) with `my_reaction`
+        filled for it and all of its nested comments.
+        """
+        nested = 'comments' if kind == 'post' else 'replies'
+
+        def comment_ids(comments):
+            for comment in comments:
+                yield comment['id']
+                yield from comment_ids(comment['replies'])
+
+        ids = list(comment_ids(data[nested]))
+        if kind == 'post':
+            reactions = self.load_my_reactions(post_ids=[data['id']], comment_ids=ids)
+        else:
+            reactions = self.load_my_reactions(comment_ids=[data['id'], *ids])
+
+        def fill(comment):
+            return {
+                **comment,
+                'my_reaction': reactions.get(ReactionBuffer.target(comment_id=comment['id'])),
+                'replies': [fill(reply) for reply in comment['replies']],
+            }
+
+        return {
+            **data,
+            'my_reaction': reactions.get(ReactionBuffer.target(**{f'{kind}_id': data['id']})),
+            nested: [fill(comment) for comment in data[nested]],
+        }
+
+
+class PostViewSet(MyReactionsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing, creating, updating, and deleting posts.
 
     - The viewset filters posts to only show published ones.
+    - Posts are paginated with `(created_at, id)` keyset cursors, newest first.
     - It provides different serializers for different actions:
         - `PostListSerializer` for listing posts.
         - `PostDetailSerializer` for viewing detailed information of a post.
     - The `perform_create` method ensures that the author of the post is set to the currently authenticated user.
         - notify all author followers for new post.
+        - generate the resized image variants in the background.
+    - Post details are served from a versioned Redis cache (see `PostDetailCache`),
+      and the cache version doubles as the `ETag` for conditional requests
+      (the list version, changed along with any post, for lists).
     """
     queryset = Post.objects.filter(
         status=StatusChoices.PUBLISHED  # Only show published posts
-    ).order_by('-created_at')
+    ).select_related('author').prefetch_related('tags', 'image_variants').defer('search_vector').order_by('-created_at')
     permission_classes = [IsAuthorOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, PostSearchFilter]  # Ranked full-text search on captions
     filterset_class = PostFilter  # Custom filter class for filtering posts
 
     def get_serializer_class(self):
@@ -48,9 +115,98 @@ class PostViewSet(viewsets.ModelViewSet):
             return PostDetailSerializer
         return PostListSerializer  # Fallback or for other actions like create/update
 
+    def get_etag(self):
+        if self.action == 'retrieve':
+            return PostDetailCache.get_version(self.kwargs['pk'])
+        if self.action == 'list':
+            return PostDetailCache.get_list_version(self.request.user.pk)
+        return None
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            return self.get_serializer(self.get_object()).data
+
+        def respond():
+            # The cached body is shared by all users, so their reactions are added afterward
+            data = PostDetailCache.get_or_build(self.kwargs['pk'], request, build)
+            return Response(self.add_my_reactions(data, 'post'))
+
+        return self.get_conditional_response(request, respond)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.load_my_reactions(post_ids=[post.id for post in page])
+        return page
+
     def perform_create(self, serializer):
         new_post = serializer.save(author=self.request.user)
         notify_followers.delay(new_post.id)  # Notify user followers for new post, using celery
+        generate_image_variants.delay(new_post.id)  # Resize the uploaded image, using celery
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        if 'image' in serializer.validated_data:
+            generate_image_variants.delay(post.id)  # Replace the variants of the old image
+
+
+class FeedView(MyReactionsMixin, APIView):
+    """
+    View to retrieve the authenticated user's home timeline, newest first.
+
+    Post IDs are read from the user's Redis timeline (filled on post creation by the
+    `notify_followers` task), merged with the recent posts of followed celebrity authors,
+    and the posts are loaded with a single `id__in` query.
+    Pages are navigated with the `before` post ID returned in the `next` link.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        page_size = KeysetPagination().get_page_size(request)  # Same page sizes as the other lists
+        before = request.query_params.get('before')
+
+        if before is not None and not before.isdigit():
+            raise ValidationError({
+                "before": "A valid post ID is required."
+            })
+
+        # Celebrity posts are not fanned out, so merge the followed ones (and own posts) at read time
+        celebrity_ids = set(TimelineManager.get_celebrity_ids())
+        if celebrity_ids:
+            celebrity_ids = {request.user.id} & celebrity_ids | set(
+                request.user.followings.filter(
+                    following_id__in=celebrity_ids
+                ).values_list('following_id', flat=True)
+            )
+
+        # Fetch one extra ID to know whether there is a next page
+        post_ids = TimelineManager.get_post_ids(
+            request.user.id,
+            before=before,
+            count=page_size + 1,
+            celebrity_ids=celebrity_ids
+        )
+        has_next = len(post_ids) > page_size
+        post_ids = post_ids[:page_size]
+
+        posts = Post.objects.filter(
+            id__in=post_ids,
+            status=StatusChoices.PUBLISHED
+        ).select_related('author').prefetch_related('tags', 'image_variants').in_bulk()
+
+        # Keep the timeline order, skipping deleted or unpublished posts
+        page = [posts[post_id] for post_id in post_ids if post_id in posts]
+        self.load_my_reactions(post_ids=[post.id for post in page])
+
+        next_link = None
+        if has_next:
+            next_link = replace_query_param(request.build_absolute_uri(), 'before', post_ids[-1])
+
+        context = {'request': request, 'view': self, 'my_reactions': self.my_reactions}
+        return Response({
+            "next": next_link,
+            "results": PostListSerializer(page, many=True, context=context).data
+        })
 
 
 class CommentCreateView(CreateModelMixin, generics.GenericAPIView):
@@ -92,13 +248,14 @@ class CommentCreateView(CreateModelMixin, generics.GenericAPIView):
             serializer.save(
                 parent=parent_comment,
                 author=user,
-                post_id=post_id
+                post_id=parent_comment.post_id  # Replies belong to the thread of their parent
             )
         else:
-            # Save as a normal comment if there's no parent
+            # Save as a normal comment if there's no parent (or on the post of the given `parent`)
+            parent = serializer.validated_data.get('parent')
             serializer.save(
                 author=user,
-                post_id=post_id
+                post_id=parent.post_id if parent else post_id
             )
 
         return super().perform_create(serializer)
@@ -110,9 +267,15 @@ class CommentCreateView(CreateModelMixin, generics.GenericAPIView):
         return self.create(request, *args, **kwargs)
 
 
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetailView(MyReactionsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     View for retrieving, updating, and deleting a single comment.
+
+    Any change to a comment, its replies or reactions replaces the cache version of
+    its post, so that version is used as the `ETag` of the comment.
+
+    Replies are nested down to `COMMENT_TREE_MAX_DEPTH` levels, loaded with a single
+    query over the comment's materialized path; deleting a comment deletes its subtree.
     """
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
@@ -121,6 +284,57 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         IsAuthorOrReadOnly
     ]
 
+    def get_etag(self):
+        post_id = Comment.objects.filter(pk=self.kwargs['pk']).values_list('post_id', flat=True).first()
+        if post_id is None:
+            return None
+        return PostDetailCache.get_version(post_id)
+
+    def retrieve(self, request, *args, **kwargs):
+        def respond():
+            comment = self.get_object()
+            build_comment_tree(comment.post_id, root=comment)
+            return Response(self.add_my_reactions(self.get_serializer(comment).data, 'comment'))
+
+        return self.get_conditional_response(request, respond)
+
+    def perform_destroy(self, instance):
+        if not instance.path:
+            instance.delete()  # Path not filled yet, the replies are deleted through the parent links
+            return
+
+        # A single range scan finds the whole thread below the comment
+        instance.get_subtree().delete()
+
+
+class ReplyPagination(KeysetPagination):
+    """
+    Keyset pagination for comment replies, oldest first.
+    """
+    ordering = 'created_at'
+
+
+class CommentRepliesView(MyReactionsMixin, generics.ListAPIView):
+    """
+    View to list the published direct replies of a published comment, oldest first.
+
+    Lets clients load deep threads on demand, one level and one page at a time;
+    each reply has a `reply_count` telling whether it has replies to load.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ReplyPagination
+
+    def get_queryset(self):
+        parent = get_object_or_404(Comment, id=self.kwargs['pk'], status=StatusChoices.PUBLISHED)
+        return parent.replies.filter(status=StatusChoices.PUBLISHED).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.load_my_reactions(comment_ids=[comment.id for comment in page])
+        return page
+
 
 class ReactionToggleView(APIView):
     """
@@ -129,6 +343,9 @@ class ReactionToggleView(APIView):
     This view allows users to:
     - Add a reaction to a post or comment (like/dislike).
     - Remove a reaction if the user clicks on the same reaction again.
+
+    With `REACTION_WRITE_BEHIND` on, toggles are buffered in Redis and answered
+    immediately; the `flush_reaction_buffer` task saves them in batches.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -141,43 +358,124 @@ class ReactionToggleView(APIView):
         3. If the reaction exists and matches the new one, remove it.
         4. If the reaction type is different, update the existing reaction.
         5. If no existing reaction, create a new one.
+
+        Every branch also adjusts the target's `likes_count`/`dislikes_count`
+        columns in the same transaction.
         """
         serializer = ReactionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         user = request.user
+        post, comment = data.get('post'), data.get('comment')
+        target = {
+            'post_id': post.id if post else None,
+            'comment_id': comment.id if comment else None,
+        }
+
+        if settings.REACTION_WRITE_BEHIND:
+            return self.buffer_reaction(user, target, data['reaction'])
 
-        # Check if the user has already reacted to this post or comment
-        user_reaction = user.reactions.filter(
-            Q(post=data.get('post')) | Q(comment=data.get('comment'))
-        ).first()
+        with transaction.atomic():
+            # Check if the user has already reacted to this post or comment
+            user_reaction = user.reactions.select_for_update().filter(
+                post=post,
+                comment=comment
+            ).first()
 
-        #
-        if user_reaction:
-            # If the reaction matches the new one, remove it
-            if user_reaction.reaction_type == data['reaction']:
-                user_reaction.delete()
+            if user_reaction:
+                old_field = Reaction.counter_field(user_reaction.reaction_type)
+
+                # If the reaction matches the new one, remove it
+                if user_reaction.reaction_type == data['reaction']:
+                    user_reaction.delete()
+                    Reaction.update_counters(**target, **{old_field: -1})
+
+                    return Response({
+                        "message": "Reaction removed."
+                    }, status=status.HTTP_200_OK)
+
+                # If the reaction is different, update the existing one
+                user_reaction.reaction_type = data['reaction']
+                user_reaction.save()
+                Reaction.update_counters(**target, **{
+                    old_field: -1,
+                    Reaction.counter_field(data['reaction']): 1
+                })
 
                 return Response({
-                    "message": "Reaction removed."
+                    "message": "Reaction updated."
                 }, status=status.HTTP_200_OK)
 
-            # If the reaction is different, update the existing one
-            user_reaction.reaction_type = data['reaction']
-            user_reaction.save()
+            # If no existing reaction, create a new one
+            reaction = serializer.save(user=user)
+            Reaction.update_counters(**target, **{
+                Reaction.counter_field(reaction.reaction_type): 1
+            })
 
+        return Response(
+            ReactionSerializer(reaction).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def buffer_reaction(self, user, target, reaction_type):
+        """
+        Toggles the reaction in the Redis buffer, without writing to the database.
+
+        Responses match the database path; an added reaction has no `id`
+        and `created_at` until it is flushed.
+        """
+        current = ReactionBuffer.toggle(
+            ReactionBuffer.target(**target),
+            user.id,
+            reaction_type,
+            lambda: user.reactions.filter(**target).values_list('reaction_type', flat=True).first()
+        )
+        if target['post_id']:
+            PostDetailCache.invalidate_user_lists(user.id)  # Their `my_reaction` in the post lists
+
+        # If the reaction matches the new one, it is removed
+        if current == reaction_type:
+            return Response({
+                "message": "Reaction removed."
+            }, status=status.HTTP_200_OK)
+
+        if current:
             return Response({
                 "message": "Reaction updated."
             }, status=status.HTTP_200_OK)
 
-        # If no existing reaction, create a new one
-        reaction = serializer.save(user=user)
         return Response(
-            ReactionSerializer(reaction).data,
+            ReactionSerializer(Reaction(user=user, reaction_type=reaction_type, **target)).data,
             status=status.HTTP_201_CREATED
         )
 
 
+class ReactionListView(generics.ListAPIView):
+    """
+    View to list the users who reacted to a published post or comment, newest first.
+
+    The target is set per url (`target='post'` or `target='comment'`), reactions can be
+    filtered by `type` (like/dislike), and pages use `(created_at, id)` keyset cursors
+    served by the covering `Reaction` indexes.
+    """
+    serializer_class = ReactionUserSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ReactionFilter
+    target = 'post'
+
+    def get_queryset(self):
+        model = Post if self.target == 'post' else Comment
+        target = get_object_or_404(model, id=self.kwargs['pk'], status=StatusChoices.PUBLISHED)
+
+        return Reaction.objects.filter(
+            **{self.target: target}
+        ).select_related('user').only(
+            'id', 'reaction_type', 'created_at', 'user__username'
+        )
+
+
 class TagView(generics.ListAPIView):
     """
     View to retrieve all tags.
@@ -185,5 +483,5 @@ class TagView(generics.ListAPIView):
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]  # Substring and fuzzy search, best match first
     search_fields = ['name', ]
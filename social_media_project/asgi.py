@@ -11,11 +11,13 @@ import os
 import django
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
+from django.urls import re_path
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_project.settings')
 django.setup()
 
 from chats.routing import websocket_urlpatterns
+from .graphql_consumer import GraphQLSubscriptionConsumer
 from .jwt_auth_middleware import JWTAuthMiddleware
 
 
@@ -25,7 +27,9 @@ application = ProtocolTypeRouter({
     # Custom Authentication
     "websocket": JWTAuthMiddleware(
         URLRouter(
-            websocket_urlpatterns
+            websocket_urlpatterns + [
+                re_path(r'ws/graphql/$', GraphQLSubscriptionConsumer.as_asgi()),  # GraphQL subscriptions
+            ]
         )
     ),
 })
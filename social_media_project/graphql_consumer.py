@@ -0,0 +1,218 @@
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.exceptions import DenyConnection
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from graphene.utils.str_converters import to_snake_case
+from graphql import ExecutionContext, GraphQLError, OperationType, execute
+from graphql.execution.collect_fields import collect_fields
+from graphql.execution.values import get_argument_values
+
+from posts.schema.subscriptions import Subscription
+from .graphql_persisted import PersistedQueries, documents
+from .graphql_view import SocialGraphQLView
+from .schema import schema
+
+import asyncio
+import json
+import types
+
+
+class GraphQLSubscriptionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket consumer serving the GraphQL subscriptions with the `graphql-transport-ws` protocol.
+
+    Every subscription listens to the channel-layer group of its field (see `Subscription.get_group`).
+    When an event reaches the group, the operation is executed with the object of the event
+    as its root value, and the result is sent as a `next` message.
+
+    Coalescable events (e.g. a burst of reactions on a post) are held for
+    `GRAPHQL_SUBSCRIPTION_COALESCE_WINDOW` seconds after the first one, and only the latest
+    event of the group is executed, so a busy post costs one execution per window per subscriber.
+
+    Only authenticated users (see `JWTAuthMiddleware`) can connect, and operations go through
+    the same validation, cost limits and persisted query rules as `/graphql/`.
+    """
+    PROTOCOL = 'graphql-transport-ws'
+
+    async def connect(self):
+        user = self.scope['user']
+
+        # If user is not logged in, reject the connection
+        if not user or not user.is_authenticated:
+            raise DenyConnection("Invalid JWT Token")
+
+        self.initialized = False
+        self.subscriptions = {}  # {subscription ID: subscription}
+        self.pending_events = {}  # {group: latest coalesced event}
+        self.flush_tasks = set()
+
+        subprotocol = self.PROTOCOL if self.PROTOCOL in self.scope.get('subprotocols', []) else None
+        await self.accept(subprotocol=subprotocol)
+
+    async def disconnect(self, close_code):
+        for task in self.flush_tasks:
+            task.cancel()
+
+        for group in {subscription['group'] for subscription in self.subscriptions.values()}:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscriptions = {}
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        try:
+            return json.loads(text_data)
+        except ValueError:
+            return None  # Closed as an invalid message
+
+    async def receive_json(self, message, **kwargs):
+        """
+        Handles the messages of the protocol.
+        """
+        message_type = message.get('type') if isinstance(message, dict) else None
+
+        if message_type == 'connection_init':
+            if self.initialized:
+                return await self.close(code=4429)  # Too many initialisation requests
+            self.initialized = True
+            await self.send_json({'type': 'connection_ack'})
+
+        elif message_type == 'ping':
+            await self.send_json({'type': 'pong'})
+
+        elif message_type == 'pong':
+            pass
+
+        elif not self.initialized:
+            await self.close(code=4401)  # Unauthorized
+
+        elif message_type == 'subscribe':
+            await self.subscribe(message.get('id'), message.get('payload'))
+
+        elif message_type == 'complete':
+            await self.unsubscribe(message.get('id'))
+
+        else:
+            await self.close(code=4400)  # Invalid message
+
+    async def subscribe(self, subscription_id, payload):
+        """
+        Validates a subscription operation and adds the connection to the group of its field.
+        """
+        if not isinstance(subscription_id, str) or not isinstance(payload, dict):
+            return await self.close(code=4400)  # Invalid message
+        if subscription_id in self.subscriptions:
+            return await self.close(code=4409)  # Subscriber already exists
+
+        if len(self.subscriptions) >= settings.GRAPHQL_MAX_SUBSCRIPTIONS:
+            subscription, errors = None, [GraphQLError(
+                f'No more than {settings.GRAPHQL_MAX_SUBSCRIPTIONS} subscriptions are allowed per connection.'
+            )]
+        else:
+            subscription, errors = await sync_to_async(self.prepare)(payload)
+
+        if errors:
+            return await self.send_json({
+                'id': subscription_id,
+                'type': 'error',
+                'payload': [error.formatted for error in errors],
+            })
+
+        self.subscriptions[subscription_id] = subscription
+        await self.channel_layer.group_add(subscription['group'], self.channel_name)
+
+    async def unsubscribe(self, subscription_id):
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return
+
+        # Leave the group unless another subscription listens to it
+        if all(other['group'] != subscription['group'] for other in self.subscriptions.values()):
+            await self.channel_layer.group_discard(subscription['group'], self.channel_name)
+
+    def prepare(self, payload):
+        """
+        Returns `(subscription, errors)` for the payload of a `subscribe` message.
+        """
+        query = payload.get('query')
+        if not isinstance(query, str) or not query:
+            return None, [GraphQLError('Must provide query string.')]
+
+        query_hash = PersistedQueries.get_hash(query)
+        if settings.GRAPHQL_PERSISTED_QUERIES_ONLY and PersistedQueries.get(query_hash) is None:
+            return None, [GraphQLError('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})]
+
+        graphql_schema = schema.graphql_schema
+        document, errors = documents.get_document(graphql_schema, query, query_hash, SocialGraphQLView.validation_rules)
+        if errors:
+            return None, errors
+
+        context = ExecutionContext.build(
+            graphql_schema,
+            document,
+            raw_variable_values=payload.get('variables'),
+            operation_name=payload.get('operationName'),
+        )
+        if isinstance(context, list):
+            return None, context  # Invalid variables or operation name
+
+        if context.operation.operation != OperationType.SUBSCRIPTION:
+            return None, [GraphQLError('Only subscription operations are supported over WebSocket.')]
+
+        # Validation guarantees a single root field
+        root_type = graphql_schema.subscription_type
+        field_nodes = collect_fields(
+            graphql_schema, context.fragments, context.variable_values, root_type, context.operation.selection_set
+        )
+        field_node = next(iter(field_nodes.values()))[0]
+        field_name = to_snake_case(field_node.name.value)
+        arguments = get_argument_values(root_type.fields[field_node.name.value], field_node, context.variable_values)
+
+        return {
+            'document': document,
+            'variables': payload.get('variables'),
+            'operation_name': payload.get('operationName'),
+            'field': field_name,
+            'group': Subscription.get_group(field_name, arguments),
+        }, None
+
+    def execute(self, subscription, event):
+        """
+        Executes a subscription operation for a group event.
+        """
+        return execute(
+            schema.graphql_schema,
+            subscription['document'],
+            root_value=Subscription.get_event_root(subscription['field'], event),
+            context_value=types.SimpleNamespace(user=self.scope['user']),  # Also holds the request's loaders
+            variable_values=subscription['variables'],
+            operation_name=subscription['operation_name'],
+        )
+
+    async def graphql_event(self, event):
+        """
+        Handles an event of a group (see `PostEvents`), sending the result of every matching subscription,
+        right away or once the coalescing window of the group ends.
+        """
+        if not event.get('coalesce'):
+            return await self.send_event(event)
+
+        group = event['group']
+        if group not in self.pending_events:
+            task = asyncio.create_task(self.send_coalesced_event(group))
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+        self.pending_events[group] = event  # Only the latest event is executed
+
+    async def send_coalesced_event(self, group):
+        await asyncio.sleep(settings.GRAPHQL_SUBSCRIPTION_COALESCE_WINDOW)
+        await self.send_event(self.pending_events.pop(group))
+
+    async def send_event(self, event):
+        for subscription_id, subscription in list(self.subscriptions.items()):
+            if subscription['group'] != event['group']:
+                continue
+
+            result = await database_sync_to_async(self.execute)(subscription, event)
+            if subscription_id in self.subscriptions:  # Not completed in the meantime
+                await self.send_json({'id': subscription_id, 'type': 'next', 'payload': result.formatted})
@@ -0,0 +1,138 @@
+from django.conf import settings
+from graphql import GraphQLError, get_named_type, is_composite_type, is_list_type, is_non_null_type
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode, IntValueNode, NullValueNode
+from graphql.validation import ValidationRule
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Rejects operations costing more than `GRAPHQL_MAX_COST` or nesting deeper than `GRAPHQL_MAX_DEPTH`.
+
+    Runs with the other validation rules, before anything is executed. Every field costs its
+    weight from `GRAPHQL_FIELD_COSTS` (`'Type.field'`), by default 1 for objects and 0 for
+    scalars, plus the cost of its selection. List fields and paginated fields (taking `first`/`last`)
+    multiply their cost by their size: the `first`/`last` argument when given as a literal
+    (up to `GRAPHQL_MAX_LIST_SIZE`), `GRAPHQL_MAX_LIST_SIZE` when given as a variable,
+    otherwise `GRAPHQL_DEFAULT_LIST_SIZE`, the page sizes `KeysetConnection` applies.
+    For connections, only their `edges` are multiplied; the connection itself and its
+    `totalCount` and `pageInfo` are resolved once per page, so they are counted once.
+
+    Variables are not known during validation (a cached document is validated once for all
+    of its variables), hence the worst case for sizes given as variables.
+
+    The cost and depth of every operation are logged when it is validated (once per process
+    for cached documents, see `DocumentCache`), to tune the limits from real traffic.
+    """
+    SIZE_ARGUMENTS = ('first', 'last')
+
+    def enter_operation_definition(self, node, *args):
+        root_type = self.context.schema.get_root_type(node.operation)
+        if root_type is None:
+            return  # Reported by the other rules
+
+        cost, depth = self.get_cost(node.selection_set, root_type, set(), 1)
+        operation = node.name.value if node.name else '<anonymous>'
+        logger.info('GraphQL %s %s: cost %d, depth %d', node.operation.value, operation, cost, depth)
+
+        if depth > settings.GRAPHQL_MAX_DEPTH:
+            self.report_error(GraphQLError(
+                f"Operation '{operation}' is nested {depth} levels deep,"
+                f" the maximum is {settings.GRAPHQL_MAX_DEPTH}.",
+                node,
+            ))
+        elif cost > settings.GRAPHQL_MAX_COST:
+            self.report_error(GraphQLError(
+                f"Operation '{operation}' costs {cost}, the maximum is {settings.GRAPHQL_MAX_COST}.",
+                node,
+            ))
+
+    def get_cost(self, selection_set, parent_type, fragments, size):
+        """
+        Returns the `(cost, depth)` of a selection set on `parent_type`.
+        `fragments` holds the fragments being expanded, to stop on cycles,
+        and `size` is the page size of `parent_type` when it is a connection.
+        """
+        cost, depth = 0, 0
+
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.get_field_cost(selection, parent_type, fragments, size)
+                cost += field_cost
+                depth = max(depth, field_depth)
+                continue
+
+            if isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                if fragment is None or name in fragments:
+                    continue  # Reported by the other rules
+                fragments = fragments | {name}
+            else:
+                fragment = selection
+
+            fragment_type = parent_type
+            if fragment.type_condition:
+                fragment_type = self.context.schema.get_type(fragment.type_condition.name.value) or parent_type
+
+            fragment_cost, fragment_depth = self.get_cost(fragment.selection_set, fragment_type, fragments, size)
+            cost += fragment_cost
+            depth = max(depth, fragment_depth)
+
+        return cost, depth
+
+    def get_field_cost(self, node, parent_type, fragments, connection_size):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', {})
+        if name.startswith('__') or name not in fields:
+            return 0, 0  # Introspection, or reported by the other rules
+
+        field_type = fields[name].type
+        named_type = get_named_type(field_type)
+
+        weight = settings.GRAPHQL_FIELD_COSTS.get(
+            f'{parent_type.name}.{name}', 1 if is_composite_type(named_type) else 0
+        )
+
+        size = self.get_size(node, fields[name], parent_type, connection_size)
+        if self.is_connection(named_type):
+            size, connection_size = 1, size  # Multiplies the edges only
+        else:
+            connection_size = 1
+
+        cost, depth = 0, 0
+        if node.selection_set and is_composite_type(named_type):
+            cost, depth = self.get_cost(node.selection_set, named_type, fragments, connection_size)
+            depth += 1
+
+        return (weight + cost) * size, depth
+
+    def get_size(self, node, field, parent_type, connection_size):
+        """
+        Returns the number of items a field is expected to return
+        (`connection_size` for the edges of a connection).
+        """
+        for argument in node.arguments or ():
+            if argument.name.value not in self.SIZE_ARGUMENTS or isinstance(argument.value, NullValueNode):
+                continue
+            if isinstance(argument.value, IntValueNode):
+                return min(max(int(argument.value.value), 0), settings.GRAPHQL_MAX_LIST_SIZE)
+            return settings.GRAPHQL_MAX_LIST_SIZE  # A variable, the largest page is allowed
+
+        if any(argument in field.args for argument in self.SIZE_ARGUMENTS):
+            return settings.GRAPHQL_DEFAULT_LIST_SIZE  # Paginated, with the default page size
+
+        field_type = field.type.of_type if is_non_null_type(field.type) else field.type
+        if not is_list_type(field_type):
+            return 1
+        if self.is_connection(parent_type):
+            return connection_size
+        return settings.GRAPHQL_DEFAULT_LIST_SIZE
+
+    @staticmethod
+    def is_connection(graphql_type):
+        fields = getattr(graphql_type, 'fields', {})
+        return 'edges' in fields and 'pageInfo' in fields
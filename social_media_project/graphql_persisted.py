@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from django.conf import settings
+from django_redis import get_redis_connection
+from graphene_django.settings import graphene_settings
+from graphql import parse
+from graphql.validation import validate
+
+import hashlib
+import threading
+
+
+class PersistedQueries:
+    """
+    Registry of persisted GraphQL queries in Redis, keyed by the sha256 of their text.
+
+    Clients send `{"extensions": {"persistedQuery": {"version": 1, "sha256Hash": ...}}}`
+    instead of the query text (automatic persisted queries). Queries registered by the
+    `register_graphql_queries` command never expire; queries registered by clients
+    (sending both the hash and the text) expire after `GRAPHQL_PERSISTED_QUERY_TIMEOUT`.
+    """
+
+    @staticmethod
+    def get_connection():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def get_hash(query):
+        return hashlib.sha256(query.encode()).hexdigest()
+
+    @staticmethod
+    def query_key(query_hash):
+        return f'graphql:query:{query_hash}'
+
+    @classmethod
+    def get(cls, query_hash):
+        """
+        Returns the text of a registered query, or None.
+        """
+        query = cls.get_connection().get(cls.query_key(query_hash))
+        return query.decode() if query is not None else None
+
+    @classmethod
+    def register(cls, query, timeout=None):
+        """
+        Registers a query (for `timeout` seconds, or forever) and returns its hash.
+        """
+        query_hash = cls.get_hash(query)
+        cls.get_connection().set(cls.query_key(query_hash), query, ex=timeout)
+        return query_hash
+
+
+class DocumentCache:
+    """
+    In-process LRU cache of parsed and validated GraphQL documents, keyed by query hash,
+    so repeated operations skip parsing and validation.
+    Only valid documents are cached, and the schema can't change while the process runs.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.documents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, query_hash):
+        with self.lock:
+            document = self.documents.get(query_hash)
+            if document is not None:
+                self.documents.move_to_end(query_hash)
+            return document
+
+    def set(self, query_hash, document):
+        with self.lock:
+            self.documents[query_hash] = document
+            self.documents.move_to_end(query_hash)
+            while len(self.documents) > self.max_size:
+                self.documents.popitem(last=False)  # Least recently used
+
+    def get_document(self, schema, query, query_hash, rules):
+        """
+        Returns `(document, errors)` for a query, parsing and validating it with `rules` unless cached.
+        """
+        document = self.get(query_hash)
+        if document is not None:
+            return document, None
+
+        try:
+            document = parse(query)
+        except Exception as e:
+            return None, [e]
+
+        validation_errors = validate(schema, document, rules, graphene_settings.MAX_VALIDATION_ERRORS)
+        if validation_errors:
+            return None, validation_errors
+
+        self.set(query_hash, document)
+        return document, None
+
+
+documents = DocumentCache(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
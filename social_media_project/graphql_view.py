@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, validate_schema
+from graphql.validation import specified_rules
+
+from posts.schema.cache import GraphQLResponseCache
+from .graphql_cost import QueryCostRule
+from .graphql_persisted import PersistedQueries, documents
+
+import json
+
+
+class SocialGraphQLView(GraphQLView):
+    """
+    The GraphQL endpoint, validating operations with the standard rules
+    plus the query cost and depth limits (see `QueryCostRule`).
+
+    Supports persisted queries (see `PersistedQueries`): operations are identified
+    by the sha256 of their text, and their parsed and validated documents are kept
+    in an in-process LRU cache. With `GRAPHQL_PERSISTED_QUERIES_ONLY`, only queries
+    registered with the `register_graphql_queries` command are accepted; otherwise
+    queries sent along with their hash are registered, once they pass validation.
+
+    Queries of anonymous clients are served from `GraphQLResponseCache`.
+    """
+    validation_rules = (*specified_rules, QueryCostRule)
+
+    @staticmethod
+    def get_persisted_query_hash(request, data):
+        """
+        Returns the hash sent in the `persistedQuery` extension, or None.
+        """
+        extensions = request.GET.get('extensions') or data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+
+        persisted_query = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+        if not isinstance(persisted_query, dict):
+            return None
+        return persisted_query.get('sha256Hash') or None
+
+    @staticmethod
+    def persisted_query_error(message, code):
+        return ExecutionResult(errors=[GraphQLError(message, extensions={'code': code})])
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        query_hash = self.get_persisted_query_hash(request, data)
+        register = False  # Whether to register the query sent along with its hash, once valid
+
+        if query_hash and not query:
+            query = PersistedQueries.get(query_hash)
+            if query is None:
+                return self.persisted_query_error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+
+        elif query_hash:
+            if PersistedQueries.get_hash(query) != query_hash:
+                return self.persisted_query_error('provided sha does not match query', 'INVALID_PERSISTED_QUERY')
+
+            if settings.GRAPHQL_PERSISTED_QUERIES_ONLY:
+                if PersistedQueries.get(query_hash) is None:
+                    return self.persisted_query_error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+            else:
+                register = True
+
+        elif not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        elif settings.GRAPHQL_PERSISTED_QUERIES_ONLY:
+            return self.persisted_query_error('PersistedQueryNotSupported', 'PERSISTED_QUERY_NOT_SUPPORTED')
+
+        else:
+            query_hash = PersistedQueries.get_hash(query)
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = documents.get_document(schema, query, query_hash, self.validation_rules)
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
+        if register:
+            PersistedQueries.register(query, timeout=settings.GRAPHQL_PERSISTED_QUERY_TIMEOUT)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'], f'Can only perform a {operation_ast.operation.value} operation from a POST request.'
+            ))
+
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.QUERY
+                and GraphQLResponseCache.is_cacheable_request(request)
+            ):
+                return GraphQLResponseCache.get_or_execute(
+                    schema, document, query_hash, operation_name, variables,
+                    lambda: execute(schema, document, **execute_options)
+                )
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
@@ -1,5 +1,5 @@
-from posts.schema import queries, mutations
+from posts.schema import queries, mutations, subscriptions
 import graphene
 
 
-schema = graphene.Schema(query=queries.Query, mutation=mutations.Mutation)
+schema = graphene.Schema(query=queries.Query, mutation=mutations.Mutation, subscription=subscriptions.Subscription)
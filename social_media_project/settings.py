@@ -48,7 +48,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
+    'rest_framework',  # Templates of the browsable API
     'django_filters',
     'channels',
     'graphene_django',
@@ -234,15 +236,84 @@ CACHES = {
     }
 }
 
+# Post image variants settings
+POST_IMAGE_VARIANTS = {  # Variant name: longest side in pixels
+    'thumbnail': 160,
+    'feed': 720,
+    'full': 1440,
+}
+POST_IMAGE_QUALITY = 80  # Encoding quality of WebP/JPEG variants
+
+# Full-text search settings
+POST_SEARCH_CONFIG = 'simple'  # Postgres text search configuration of captions; `simple` does not stem
+
+# Post detail cache settings
+POST_CACHE_TIMEOUT = 60 * 10  # Seconds a serialized post stays cached
+POST_CACHE_LOCK_TIMEOUT = 10  # Seconds a cache fill may hold its lock
+POST_CACHE_LOCK_WAIT = 2  # Seconds a request waits for another request's fill
+
+# Comment tree settings
+COMMENT_TREE_MAX_DEPTH = 3  # Reply levels nested in post details, deeper ones are loaded on demand
+
+# Reaction write-behind settings
+REACTION_WRITE_BEHIND = env.bool('REACTION_WRITE_BEHIND', default=False)  # Buffer toggles in Redis
+REACTION_FLUSH_INTERVAL = 5  # Seconds between flushes of the buffered toggles
+REACTION_FLUSH_BATCH_SIZE = 1000  # Posts/comments flushed per run
+
+# Home timeline settings
+TIMELINE_MAX_LENGTH = 800  # Newest posts kept per user timeline
+TIMELINE_FANOUT_BATCH_SIZE = 500  # Timelines updated per Redis pipeline round trip
+TIMELINE_FANOUT_CHUNK_SIZE = 5000  # Followers handled by each fan-out subtask
+TIMELINE_CELEBRITY_THRESHOLD = 10000  # Authors with more followers are merged into feeds at read time
+TIMELINE_AUTHOR_POSTS_LENGTH = 100  # Newest posts kept per celebrity author
+
 # GraphQL settings
 GRAPHENE = {
     'SCHEMA': 'social_media_project.schema.schema'
 }
+GRAPHQL_MAX_COST = 1000  # Operations costing more are rejected before execution
+GRAPHQL_MAX_DEPTH = 6  # Levels of nested objects allowed per operation
+GRAPHQL_DEFAULT_LIST_SIZE = 10  # Default page size of connections, and items assumed for unpaginated lists
+GRAPHQL_MAX_LIST_SIZE = 100  # Largest page size of connections, assumed for `first`/`last` variables
+GRAPHQL_FIELD_COSTS = {  # Weights overriding the defaults (1 per object, 0 per scalar)
+    'PostConnection.totalCount': 10,  # COUNT(*) of the published posts, once per connection
+    'TagConnection.totalCount': 10,
+}
+GRAPHQL_PERSISTED_QUERIES_ONLY = env.bool('GRAPHQL_PERSISTED_QUERIES_ONLY', default=False)  # Reject unregistered queries
+GRAPHQL_PERSISTED_QUERY_TIMEOUT = 60 * 60 * 24 * 30  # Seconds queries registered by clients are kept
+GRAPHQL_DOCUMENT_CACHE_SIZE = 500  # Parsed and validated documents cached per process
+GRAPHQL_MAX_SUBSCRIPTIONS = 50  # Subscriptions per WebSocket connection
+GRAPHQL_SUBSCRIPTION_COALESCE_WINDOW = 0.5  # Seconds the update events of a post are coalesced for
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = 300  # Seconds anonymous query responses are cached for, at most
+GRAPHQL_CACHE_HINTS = {  # Max-ages (seconds) of the responses selecting a field, 0 for viewer-dependent fields
+    'PostType.likesCount': 30,  # Counters change constantly
+    'PostType.dislikesCount': 30,
+    'CommentType.likesCount': 30,
+    'CommentType.dislikesCount': 30,
+}
+
+# Logging settings
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'social_media_project.graphql_cost': {'handlers': ['console'], 'level': 'INFO'},  # Operation costs
+    },
+}
 
 # Celery settings
 CELERY_BROKER_URL = env('CELERY_BROKER')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'flush-reaction-buffer': {
+        'task': 'posts.tasks.flush_reaction_buffer',
+        'schedule': REACTION_FLUSH_INTERVAL,
+    },
+}
 
 # Cors settings (for public)
 CORS_ALLOW_ALL_ORIGINS = True
@@ -0,0 +1,36 @@
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest, Upper
+from rest_framework.filters import SearchFilter
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Substring and fuzzy search backed by `pg_trgm` GIN indexes.
+
+    For every field in the view's `search_fields`, matches rows that contain the search
+    term (`icontains`) or are similar to it (the trigram `%` operator). Both conditions
+    are written against `UPPER(field)`, which is what Django's `icontains` compiles to
+    on PostgreSQL, so a single `GinIndex(OpClass(Upper(field), 'gin_trgm_ops'))` serves
+    them instead of a sequential scan. Results are ordered by trigram similarity to the
+    term, best match first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        term = ' '.join(self.get_search_terms(request))
+
+        if not search_fields or not term:
+            return queryset
+
+        condition = Q()
+        similarities = []
+        for field in search_fields:
+            condition |= Q(**{f'{field}__icontains': term}) | Q(TrigramSimilar(Upper(field), term.upper()))
+            similarities.append(TrigramSimilarity(Upper(field), term.upper()))
+
+        similarity = similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+        return queryset.filter(condition).annotate(
+            search_similarity=similarity
+        ).order_by('-search_similarity', *queryset.query.order_by)
@@ -0,0 +1,55 @@
+from django.utils.cache import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+import hashlib
+
+
+class ConditionalGetMixin:
+    """
+    Adds strong `ETag`s to `retrieve`/`list` responses and answers matching
+    `If-None-Match` requests with `304 Not Modified` before the serializer runs.
+
+    Views implement `get_etag()`, returning a cheap version of the resource
+    (e.g. a counter version or a high-water mark), or None to skip the check.
+    The version is hashed together with the URL, the user and the renderer,
+    since all of them change the response body.
+    """
+
+    def get_etag(self):
+        return None
+
+    def get_conditional_response(self, request, respond):
+        """
+        Returns `304 Not Modified` if the client has the current version,
+        otherwise calls `respond()` and tags its response.
+        """
+        version = self.get_etag()
+        if version is None:
+            return respond()
+
+        etag = quote_etag(hashlib.sha1(
+            f'{version}:{request.build_absolute_uri()}:{request.user.pk}:{request.accepted_renderer.format}'.encode()
+        ).hexdigest())
+
+        # `If-None-Match` uses the weak comparison, so ignore the `W/` prefixes
+        client_etags = {
+            client_etag.removeprefix('W/')
+            for client_etag in parse_etags(request.headers.get('If-None-Match', ''))
+        }
+        if etag in client_etags or '*' in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = respond()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        handler = super().retrieve
+        return self.get_conditional_response(request, lambda: handler(request, *args, **kwargs))
+
+    def list(self, request, *args, **kwargs):
+        handler = super().list
+        return self.get_conditional_response(request, lambda: handler(request, *args, **kwargs))
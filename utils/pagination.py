@@ -0,0 +1,197 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+import base64
+import binascii
+import json
+
+
+def encode_position(obj, field, reverse=False):
+    """
+    Encodes the position of `obj` in a `(field, id)` ordering into an opaque, url-safe cursor.
+    Shared by `KeysetPagination` and the GraphQL connections, so both read each other's cursors.
+    """
+    position = {'value': getattr(obj, field), 'id': obj.id, 'reverse': reverse}
+    # `str()` keeps the full (microsecond) precision of datetimes, which the seek needs
+    return base64.urlsafe_b64encode(json.dumps(position, default=str).encode()).decode()
+
+
+def decode_position(cursor, model, field):
+    """
+    Decodes a cursor made by `encode_position` into `{'value': ..., 'id': ..., 'reverse': ...}`,
+    restoring the python type of the value (e.g. datetimes) from the model field.
+
+    Raises `ValueError` if the cursor is invalid.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value, pk, reverse = position['value'], int(position['id']), bool(position['reverse'])
+    except (TypeError, ValueError, KeyError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+    try:
+        value = model._meta.get_field(field).to_python(value)
+    except FieldDoesNotExist:
+        pass  # Not a model field (e.g. an annotation)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    return {'value': value, 'id': pk, 'reverse': reverse}
+
+
+def seek(field, value, pk, descending):
+    """
+    Builds the condition selecting the rows after `(value, pk)` in a `(field, id)` scan.
+
+    The redundant `<=`/`>=` bound on the ordering field keeps the condition
+    sargable, so the database starts the index scan right at the cursor.
+    """
+    lookup = 'lt' if descending else 'gt'
+    return Q(**{f'{field}__{lookup}e': value}) & (
+        Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over `(<ordering field>, id)`.
+
+    Instead of `OFFSET` and a `COUNT(*)`, every page is fetched with a
+    `WHERE (field, id) < (last_value, last_id) ... LIMIT n` condition, so deep pages
+    cost the same as the first one as long as a composite index on `(field, id)` exists.
+
+    Cursors are opaque, url-safe base64 strings holding the position of the
+    first/last item of the current page and the direction of the scan.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'  # The `id` column is always used as the tiebreaker
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = self.get_ordering(request, queryset, view)
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+
+        cursor = self.decode_cursor(request, queryset)
+        reverse = cursor['reverse'] if cursor else False
+
+        # Going backwards means scanning the index in the opposite direction
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if cursor:
+            queryset = queryset.filter(seek(self.field, cursor['value'], cursor['id'], descending))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        """
+        Returns the page size, optionally overridden by the client up to `max_page_size`.
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns the ordering field, prefixed with `-` for descending order.
+
+        Filter backends of the view can override it (e.g. to page over a search rank)
+        by implementing `get_keyset_ordering(request, queryset, view)`.
+        """
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_keyset_ordering'):
+                ordering = backend().get_keyset_ordering(request, queryset, view)
+                if ordering:
+                    return ordering
+
+        return self.ordering
+
+    def encode_cursor(self, obj, reverse):
+        """
+        Encodes the position of `obj` into an opaque cursor url.
+        """
+        token = encode_position(obj, self.field, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        """
+        Decodes the cursor from the request, if there is one.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            return decode_position(token, queryset.model, self.field)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
@@ -0,0 +1,56 @@
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+import hashlib
+import os
+
+
+@deconstructible(path='utils.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 digest of their content.
+
+    Uploads are hashed while streaming them in chunks (they are never read into memory
+    at once) and stored as `<upload_to>/<aa>/<bb>/<digest><ext>`. Saving bytes that are
+    already stored returns the existing name without writing a duplicate file.
+
+    The storage itself never deletes shared files on its own; callers track how many
+    rows reference each file (see `posts.models.ImageBlob`).
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)  # The same name always means the same bytes
+        super().__init__(**kwargs)
+
+    def get_digest(self, content):
+        """
+        Returns the SHA-256 hex digest of `content`, read chunk by chunk.
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks(chunk_size=self.chunk_size):
+            digest.update(chunk)
+
+        content.seek(0)  # Rewind, so the file can be written afterwards
+        return digest.hexdigest()
+
+    def get_content_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, self.get_digest(content))
+
+        # Identical content is stored only once
+        if self.exists(name):
+            return name
+
+        return super().save(name, content, max_length=max_length)